@@ -0,0 +1,299 @@
+#! /usr/bin/env python3
+"""
+Benchmarks for the test runner.
+
+./bin/benchmark.py startup   time cold ./bin/run.sh runs against bin/startup-budget.json
+./bin/benchmark.py index     time indexing a synthetic test file and looking up test_code
+./bin/benchmark.py serialize time writing results.json for many synthetic tests
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from dataclasses import asdict
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+BUDGET = ROOT.joinpath("bin", "startup-budget.json")
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (.+)$")
+
+# measured timings may exceed the recorded ones by this factor when writing a budget
+HEADROOM = 1.5
+
+
+def parse_importtime(text: str) -> Dict[str, float]:
+    """
+    Cumulative import time in milliseconds of every module in -X importtime output.
+    """
+    modules = {}
+    for line in text.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            modules[match.group(3).strip()] = int(match.group(2)) / 1000
+    return modules
+
+
+def profile_startup(exercise_dir: Path, runs: int):
+    """
+    Run the runner cold on the given exercise, returning the median phase
+    timings and module import times across the runs.
+    """
+    phases: Dict[str, List[float]] = defaultdict(list)
+    imports: Dict[str, List[float]] = defaultdict(list)
+
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="runner-startup") as tmp_dir:
+            subprocess.run(
+                ["./bin/run.sh", exercise_dir.name, exercise_dir, tmp_dir],
+                cwd=ROOT,
+                env={"RUNNER_STARTUP_PROFILE": tmp_dir, "PATH": os.environ.get("PATH", "")},
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            profile = json.loads(Path(tmp_dir, "phases.json").read_text())
+            for phase, millis in profile["phases_ms"].items():
+                phases[phase].append(millis)
+            phases["total"].append(profile["total_ms"])
+            for module, millis in parse_importtime(Path(tmp_dir, "importtime.txt").read_text()).items():
+                imports[module].append(millis)
+
+    return (
+        {phase: median(values) for phase, values in phases.items()},
+        {module: median(values) for module, values in imports.items()},
+    )
+
+
+def startup(opts) -> int:
+    """
+    Compare cold start timings against the budget.
+    """
+    phases, imports = profile_startup(opts.exercise.resolve(), opts.runs)
+
+    if opts.write_budget:
+        budget = {phase: round(millis * HEADROOM, 1) for phase, millis in phases.items()}
+        opts.budget.write_text(json.dumps({"phases_ms": budget}, indent=2) + "\n")
+        print(f"wrote {opts.budget}")
+
+    budget = json.loads(opts.budget.read_text())["phases_ms"]
+    over = []
+    print(f"{'phase':<20} {'median ms':>10} {'budget ms':>10}")
+    for phase, millis in phases.items():
+        limit = budget.get(phase)
+        flag = ""
+        if limit is not None and millis > limit:
+            over.append(phase)
+            flag = "  OVER BUDGET"
+        print(f"{phase:<20} {millis:>10.1f} {limit if limit is not None else '-':>10}{flag}")
+
+    print(f"\ntop {opts.top} modules by cumulative import time:")
+    for module, millis in sorted(imports.items(), key=lambda item: -item[1])[: opts.top]:
+        print(f"{millis:>10.1f} ms  {module}")
+
+    if over:
+        print(f"\nover budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+def synthetic_tests(count: int) -> str:
+    """
+    A generated-style test file with count tests, each with a data table
+    and a subTest loop.
+    """
+    table = ", ".join(f'({i}, {{"input": [{i}, {i + 1}]}})' for i in range(10))
+    lines = ["import unittest", "", "from synthetic import solve", "", "", "class SyntheticTest(unittest.TestCase):"]
+    for number in range(count):
+        lines += [
+            f"    def test_case_{number}(self):",
+            f"        cases = [{table}]",
+            "        for expected, data in cases:",
+            "            with self.subTest(data=data):",
+            "                self.assertEqual(solve(data['input']), expected)",
+            "",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def best_ms(func: Callable[[], object], runs: int) -> float:
+    """
+    Fastest of several timed calls of func, in milliseconds.
+    """
+    timings = []
+    for _ in range(runs):
+        start = perf_counter()
+        func()
+        timings.append((perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def index(opts) -> int:
+    """
+    Time TestOrder indexing a large test file and serving test_code lookups,
+    next to the full AST walk and per-report re-read it replaced.
+    """
+    from runner.data import Hierarchy  # pylint: disable=import-outside-toplevel
+    from runner.sort import TestOrder  # pylint: disable=import-outside-toplevel
+
+    with tempfile.TemporaryDirectory(prefix="runner-index") as tmp_dir:
+        test_file = Path(tmp_dir, "synthetic_test.py")
+        test_file.write_text(synthetic_tests(opts.tests))
+        text = test_file.read_text()
+        tree = ast.parse(text)
+        test_ids = [Hierarchy(f"synthetic_test.py::SyntheticTest::test_case_{n}") for n in range(opts.tests)]
+
+        def index_file():
+            TestOrder._sources.clear()
+            TestOrder._cache.clear()
+            TestOrder.index(test_file)
+
+        def lookups():
+            for test_id in test_ids:
+                TestOrder.function_source(test_id, test_file)
+
+        def reread():
+            for test_id in test_ids[: opts.reports]:
+                info = TestOrder._cache[test_id]
+                TestOrder.dedent(test_file.read_text().splitlines()[info.lineno : info.end_lineno + 1])
+
+        timings = {
+            "ast.parse": best_ms(lambda: ast.parse(text), opts.runs),
+            "index walk": best_ms(lambda: TestOrder(text).visit(tree.body), opts.runs),
+            "full AST walk (before)": best_ms(lambda: ast.NodeVisitor().visit(tree), opts.runs),
+            "index file": best_ms(index_file, opts.runs),
+        }
+        per_report = {
+            "test_code lookup": best_ms(lookups, opts.runs) / len(test_ids) * 1000,
+            "re-read and dedent (before)": best_ms(reread, opts.runs) / opts.reports * 1000,
+        }
+
+    print(f"{opts.tests} tests, {len(text) / 1024:.0f} KiB\n")
+    for name, millis in timings.items():
+        print(f"{name:<30} {millis:>10.2f} ms")
+    for name, micros in per_report.items():
+        print(f"{name:<30} {micros:>10.2f} us per report")
+    return 0
+
+
+def synthetic_results(count: int):
+    """
+    Results of a concept exercise with count tests, most of them failing
+    variations with output.
+    """
+    from runner.data import Results, Test  # pylint: disable=import-outside-toplevel
+
+    results = Results()
+    for number in range(count):
+        task, variation = divmod(number, 50)
+        if variation == 0:
+            test = Test(f"SyntheticTest.test_task_{task}", task_id=task + 1)
+        else:
+            test = Test(f"SyntheticTest.test_task_{task} [variation #{variation}]", task_id=task + 1)
+            test.fail(f"AssertionError: {variation} != {variation + 1}")
+            test.output = f"solving case {variation}\n" * 20
+        test.test_code = "for expected, data in cases:\n    with self.subTest(data=data):\n        assert solve(data)"
+        results.add(test)
+    return results
+
+
+def as_json_before(results) -> str:
+    """
+    results.json as it was serialized before Results.write: a deep copy with
+    asdict, then renaming and sorting the copied tests, then json.dumps.
+    """
+    from runner.data import TRIM_NAME, Results, Status  # pylint: disable=import-outside-toplevel
+
+    def factory(items):
+        return {
+            key: value.name.lower() if isinstance(value, Status) else value
+            for key, value in items
+            if Results._include(key, value)
+        }
+
+    data = asdict(results, dict_factory=factory)
+    concept_exercise = False
+    for item in data["tests"]:
+        parent = "[variation" not in item["name"] and item["task_id"] > 0
+        concept_exercise = concept_exercise or parent
+        item["name"] = re.sub(TRIM_NAME, "\\1 > ", item["name"]).replace("_", " ") + ("~" if parent else "")
+    if concept_exercise:
+        data["tests"] = sorted(data["tests"], key=lambda item: (item["task_id"], item["name"]))
+    else:
+        data["tests"] = sorted(data["tests"], key=lambda item: item["task_id"])
+    return json.dumps(data, indent=2)
+
+
+def serialize(opts) -> int:
+    """
+    Time serializing results.json for many tests, next to the asdict and
+    json.dumps serialization it replaced.
+    """
+    from runner.output import write_results  # pylint: disable=import-outside-toplevel
+
+    results = synthetic_results(opts.tests)
+    if results.as_json() != as_json_before(results):
+        print("Results.as_json differs from the serialization before it")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="runner-serialize") as tmp_dir:
+        out_file = Path(tmp_dir, "results.json")
+        serializers = {
+            "asdict + json.dumps (before)": lambda: as_json_before(results),
+            "as_json": results.as_json,
+            "write_results": lambda: write_results(out_file, results),
+            "write_results, compact": lambda: write_results(out_file, results, None),
+        }
+        size = len(results.as_json())
+
+        print(f"{opts.tests} tests, {size / 1024:.0f} KiB of results.json\n")
+        for name, func in serializers.items():
+            millis = best_ms(func, opts.runs)
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:<30} {millis:>10.2f} ms {peak / 1024:>10.0f} KiB peak")
+    return 0
+
+
+def get_cli() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    startup_cli = commands.add_parser("startup", help="time cold runs against the startup budget")
+    startup_cli.set_defaults(func=startup)
+    startup_cli.add_argument("--exercise", type=Path, default=ROOT.joinpath("test", "example-success"))
+    startup_cli.add_argument("--runs", type=int, default=10)
+    startup_cli.add_argument("--top", type=int, default=15, help="number of modules to list")
+    startup_cli.add_argument("--budget", type=Path, default=BUDGET)
+    startup_cli.add_argument("--write-budget", action="store_true", help="record the measured timings as the budget")
+
+    index_cli = commands.add_parser("index", help="time test indexing and test_code lookups")
+    index_cli.set_defaults(func=index)
+    index_cli.add_argument("--tests", type=int, default=5000, help="number of tests in the synthetic file")
+    index_cli.add_argument("--runs", type=int, default=5)
+    index_cli.add_argument("--reports", type=int, default=200, help="number of re-read reports to time")
+
+    serialize_cli = commands.add_parser("serialize", help="time writing results.json")
+    serialize_cli.set_defaults(func=serialize)
+    serialize_cli.add_argument("--tests", type=int, default=10000, help="number of synthetic tests")
+    serialize_cli.add_argument("--runs", type=int, default=5)
+    return parser
+
+
+def main():
+    opts = get_cli().parse_args()
+    raise SystemExit(opts.func(opts))
+
+
+if __name__ == "__main__":
+    main()
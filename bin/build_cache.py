@@ -0,0 +1,51 @@
+#! /usr/bin/env python3
+"""
+Pre-build the test runner's shared cache for every test file of a track, so
+that runs only have to compile the student's own code.
+./bin/build_cache.py ~/exercism/python --cache-dir /opt/test-runner/cache
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# pylint: disable=wrong-import-position
+from runner.bytecode import cache_key, rewrite, store
+from runner.sort import TestOrder
+from runner.testindex import INDEX_FILE, content_key, write_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("track", type=Path, help="checkout of the track repository")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=os.environ.get("RUNNER_CACHE_DIR"),
+        required="RUNNER_CACHE_DIR" not in os.environ,
+        help="cache to populate (default: $RUNNER_CACHE_DIR)",
+    )
+    opts = parser.parse_args()
+
+    count = 0
+    index = {}
+    for test_file in sorted(opts.track.rglob("*_test.py")):
+        source = test_file.read_bytes()
+        try:
+            code = rewrite(source, str(test_file))
+        except SyntaxError as err:
+            print(f"skipping {test_file}: {err}")
+            continue
+        store(opts.cache_dir.joinpath("bytecode"), cache_key(source), code)
+        text = test_file.read_text()
+        index[content_key(text)] = TestOrder.parse(text, test_file.name)
+        count += 1
+    write_index(opts.cache_dir.joinpath(INDEX_FILE), index)
+    print(f"cached {count} test files in {opts.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#! /usr/bin/env python3
+"""
+Thin client for a test runner started with `./bin/run.py --serve SOCKET`.
+Takes the same arguments as bin/run.sh, which the daemon parses, and only
+needs the standard library:
+RUNNER_SOCKET=/run/runner.sock ./bin/client.py two_fer ~/solution/ ~/solution/output/
+"""
+import json
+import os
+import socket
+import sys
+
+
+def main():
+    """
+    Forward the CLI arguments to the daemon and wait for the run to finish.
+    """
+    request = {"argv": sys.argv[1:], "cwd": os.getcwd()}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(os.environ["RUNNER_SOCKET"])
+        conn.sendall(json.dumps(request).encode() + b"\n")
+        response = json.loads(conn.makefile("rb").readline())
+
+    if not response["ok"]:
+        print(f"{sys.argv[0]}: error: {response['message']}", file=sys.stderr)
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,54 +3,50 @@
 CLI for the test runner for the Python track on Exercism.io.
 ./bin/run.sh two_fer ~/solution-238382y7sds7fsadfasj23j/ ~/solution-238382y7sds7fsadfasj23j/output/
 """
-from argparse import ArgumentParser, ArgumentTypeError, REMAINDER
-
-import runner
-import runner.utils
-
-
-def _slug(arg):
-    try:
-        return runner.utils.slug(arg)
-    except ValueError as err:
-        raise ArgumentTypeError(str(err))
+import os
+from pathlib import Path
+from time import perf_counter
 
+START = perf_counter()
 
-def _directory(arg):
-    try:
-        return runner.utils.directory(arg)
-    except (FileNotFoundError, PermissionError) as err:
-        raise ArgumentTypeError(str(err))
+# pylint: disable=wrong-import-position
+import runner
+import runner.batch
+import runner.cli
+import runner.serve
+from runner.timing import Phases
 
 
 def main():
     """
     Parse CLI arguments and run the tests.
     """
-    parser = ArgumentParser(description="Run the tests of a Python exercise.")
+    phases = Phases(START)
+    phases.mark("import runner")
+
+    parser = runner.cli.build_parser()
+    args = parser.parse_args()
+    options = runner.cli.get_options(args)
 
-    parser.add_argument(
-        "slug", metavar="SLUG", type=_slug, help="name of the exercise to process",
-    )
+    if args.serve is not None:
+        runner.serve.serve(args.serve, fork=args.fork)
+        return
 
-    parser.add_argument(
-        "input",
-        metavar="IN",
-        type=_directory,
-        help="directory where the [EXERCISE.py] file is located",
-    )
+    if args.batch is not None:
+        summary = args.summary or args.batch.with_suffix(".summary.json")
+        runner.batch.batch(args.batch, summary, options)
+        return
 
-    parser.add_argument(
-        "output",
-        metavar="OUT",
-        type=_directory,
-        help="directory where the results.json will be written",
-    )
+    if args.output is None:
+        parser.error("the following arguments are required: SLUG, IN, OUT")
+    phases.mark("argument parsing")
 
-    parser.add_argument("pytest_args", nargs=REMAINDER)
+    runner.run(args.slug, args.input, args.output, args.pytest_args, options, phases)
 
-    args = parser.parse_args()
-    runner.run(args.slug, args.input, args.output, args.pytest_args)
+    # see ./bin/benchmark.py startup
+    profile_dir = os.environ.get("RUNNER_STARTUP_PROFILE")
+    if profile_dir:
+        phases.write(Path(profile_dir).joinpath("phases.json"))
 
 
 if __name__ == "__main__":
@@ -1,5 +1,17 @@
 #! /usr/bin/env sh
 
 root="$( dirname "$( cd "$( dirname "$0" )" >/dev/null 2>&1 && pwd )" )"
+
+# hand the run to a warm `bin/run.py --serve` daemon when one is listening
+if [ -n "$RUNNER_SOCKET" ] && [ -S "$RUNNER_SOCKET" ]; then
+    exec /usr/bin/env python3 "$root/bin/client.py" "$@"
+fi
+
 export PYTHONPATH="$root:$PYTHONPATH"
-/usr/bin/env python3 bin/run.py "$@"
\ No newline at end of file
+
+# record import times and phase timings into the given directory
+if [ -n "$RUNNER_STARTUP_PROFILE" ]; then
+    exec /usr/bin/env python3 -X importtime bin/run.py "$@" 2>"$RUNNER_STARTUP_PROFILE/importtime.txt"
+fi
+
+/usr/bin/env python3 bin/run.py "$@"
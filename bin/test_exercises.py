@@ -3,15 +3,22 @@
 where this track repo is mounted at /python
 """
 import argparse
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import errno
 from functools import wraps
+import hashlib
+from importlib import metadata
 from itertools import zip_longest
 import json
+import os
 from pathlib import Path
 import shutil
 import subprocess
 import sys
 import tempfile
-from typing import List
+import threading
+from typing import IO, List, Optional, Tuple
 from data import Config, ExerciseConfig, ExerciseInfo, ExerciseStatus
 
 # Allow high-performance tests to be skipped
@@ -21,42 +28,91 @@ TEST_RUNNER_DIR = Path('/__w/python-test-runner/python-test-runner/')
 
 RUNNERS = {}
 
+# test files with their skips stripped, by content hash, so that they can be
+# hardlinked into the workdirs: in a directory of the run's own, made next to
+# the workdirs in the temp directory and removed when the run exits
+STRIPPED_DIRS = {}
+STRIPPED_LOCK = threading.Lock()
+
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'test-exercises'
+
+# the files of the test runner that decide the outcome of a check
+RUNNER_SOURCES = ['runner/**/*.py', 'runner/*.ini', 'bin/run.py', 'bin/run.sh', 'requirements.txt', 'Dockerfile']
+
+# the exit codes of pytest that are an outcome of the tests: passed, failed and no tests
+PYTEST_OUTCOMES = (0, 1, 5)
+
 
 def runner(name):
     def _decorator(runner_func):
         RUNNERS[name] = runner_func
         @wraps(runner_func)
-        def _wrapper(exercise: ExerciseInfo, workdir: Path, quiet: bool = False):
-            return runner_func(exercise, workdir, quiet=quiet)
+        def _wrapper(exercise: ExerciseInfo, workdir: Path, quiet: bool = False, output: Optional[IO] = None):
+            return runner_func(exercise, workdir, quiet=quiet, output=output)
         return _wrapper
     return _decorator
 
 
-def copy_file(src: Path, dst: Path, strip_skips=False):
-    if strip_skips:
+# directories whose files couldn't be hardlinked into a workdir
+UNLINKABLE = set()
+
+
+def link_file(src: Path, dst: Path):
+    """Hardlink src to dst, or copy it where it can't be linked (eg. across filesystems).
+
+    A file already at dst is replaced rather than written to, as it may be a link itself."""
+    dst.unlink(missing_ok=True)
+    if src.parent not in UNLINKABLE:
+        try:
+            os.link(src, dst)
+            return
+        except OSError as err:
+            if err.errno in (errno.EXDEV, errno.EPERM):
+                UNLINKABLE.add(src.parent)
+    shutil.copy2(src, dst)
+
+
+def stripped_dir() -> Path:
+    """The run's directory of stripped test files in the current temp directory.
+
+    It is private to the run, so nobody else can put a file there under a hash it will link."""
+    tmp_dir = tempfile.gettempdir()
+    with STRIPPED_LOCK:
+        if tmp_dir not in STRIPPED_DIRS:
+            STRIPPED_DIRS[tmp_dir] = Path(tempfile.mkdtemp(prefix='test-exercises-stripped'))
+            atexit.register(shutil.rmtree, STRIPPED_DIRS[tmp_dir], ignore_errors=True)
+        return STRIPPED_DIRS[tmp_dir]
+
+
+def stripped_file(src: Path) -> Path:
+    """A copy of src without its unittest skips, made once per content."""
+    cache_dir = stripped_dir()
+    stripped = cache_dir / (hashlib.sha256(src.read_bytes()).hexdigest() + src.suffix)
+    if not stripped.is_file():
         with src.open('r') as src_file:
             lines = [line for line in src_file.readlines()
                         if not line.strip().startswith('@unittest.skip')]
-        with dst.open('w') as dst_file:
+        # written aside and moved in place, as other checks may be linking it
+        with tempfile.NamedTemporaryFile('w', dir=cache_dir, delete=False) as dst_file:
             dst_file.writelines(lines)
-    else:
-        shutil.copy2(src, dst)
+        os.chmod(dst_file.name, 0o644)
+        os.replace(dst_file.name, stripped)
+    return stripped
+
+
+def copy_file(src: Path, dst: Path, strip_skips=False):
+    if strip_skips:
+        src = stripped_file(src)
+    link_file(src, dst)
 
 def copy_solution_files(exercise: ExerciseInfo, workdir: Path, exercise_config: ExerciseConfig = None):
+    # helper files are staged with the tests, by copy_test_files
     if exercise_config is not None:
         solution_files = exercise_config.files.solution
         exemplar_files = exercise_config.files.exemplar
-        helper_files = exercise_config.files.editor
     else:
         solution_files = []
         exemplar_files = []
-        helper_files = []
-
-    if helper_files:
-        helper_files = [exercise.path / h for h in helper_files]
-        for helper_file in helper_files:
-            dst = workdir / helper_file.relative_to(exercise.path)
-            copy_file(helper_file, dst)
 
     if not solution_files:
         solution_files.append(exercise.solution_stub.name)
@@ -109,55 +165,228 @@ def copy_exercise_files(exercise: ExerciseInfo, workdir: Path):
     copy_test_files(exercise, workdir, exercise_config)
 
 
-@runner('pytest')
-def run_with_pytest(_exercise, workdir, quiet: bool = False) -> int:
-    kwargs = {'cwd': str(workdir)}
+def output_kwargs(quiet: bool = False, output: Optional[IO] = None) -> dict:
+    """Where a runner's subprocess writes to: nowhere, the given file or the terminal."""
     if quiet:
-        kwargs['stdout'] = subprocess.DEVNULL
-        kwargs['stderr'] = subprocess.DEVNULL
-    return subprocess.run([sys.executable, '-m', 'pytest'], **kwargs).returncode
+        return {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+    if output is not None:
+        return {'stdout': output, 'stderr': subprocess.STDOUT}
+    return {}
 
 
-@runner('test-runner')
-def run_with_test_runner(exercise, workdir, quiet: bool = False) -> int:
-    kwargs = {}
-    if quiet:
-        kwargs['stdout'] = subprocess.DEVNULL
-        kwargs['stderr'] = subprocess.DEVNULL
+@runner('pytest')
+def run_with_pytest(_exercise, workdir, quiet: bool = False, output: Optional[IO] = None) -> Optional[int]:
+    kwargs = {'cwd': str(workdir), **output_kwargs(quiet, output)}
+    ret = subprocess.run([sys.executable, '-m', 'pytest'], **kwargs).returncode
+    # interrupted, internal or usage errors (or a signal) say nothing about the exercise
+    return ret if ret in PYTEST_OUTCOMES else None
+
+
+def run_test_runner(mount: Path, root: Path, run_args: list, **kwargs):
+    """Run the test runner's `bin/run.sh` with run_args: from its checkout when inside its
+    container, where mount is root, or else in a container of it with mount at root."""
     if TEST_RUNNER_DIR.is_dir():
         kwargs['cwd'] = str(TEST_RUNNER_DIR)
-        args = ['./bin/run.sh', exercise.slug, workdir, workdir]
+        args = ['./bin/run.sh', *run_args]
     else:
         args = [
-            'docker compose',
+            'docker', 'compose',
             'run',
             '-w', str(TEST_RUNNER_DIR),
             '--entrypoint', './bin/run.sh',
-            '-v', f'{workdir}:/{exercise.slug}',
+            '-v', f'{mount}:{root}',
             'test-runner',
-            exercise.slug,
-            f'/{exercise.slug}',
-            f'/{exercise.slug}',
+            *map(str, run_args),
         ]
-    subprocess.run(args, **kwargs)
-    results_file = workdir / 'results.json'
+    return subprocess.run(args, **kwargs)
+
+
+def mount_point(mount: Path, container_root: Path) -> Path:
+    """Where run_test_runner finds the mounted directory."""
+    return mount if TEST_RUNNER_DIR.is_dir() else container_root
+
+
+@runner('test-runner')
+def run_with_test_runner(exercise, workdir, quiet: bool = False, output: Optional[IO] = None) -> Optional[int]:
+    root = mount_point(workdir, Path(f'/{exercise.slug}'))
+    run_test_runner(workdir, root, [exercise.slug, root, root], **output_kwargs(quiet, output))
+    return results_outcome(workdir / 'results.json')
+
+
+def results_outcome(results_file: Path) -> Optional[int]:
+    """0 if the results say the tests passed, 1 if not, and None if the runner wrote none."""
     if results_file.is_file():
         with results_file.open() as f:
             results = json.load(f)
-        if results['status'] == 'pass':
-            return 0
-    return 1
-
-
-def check_assignment(exercise: ExerciseInfo, runner: str = 'pytest', quiet: bool = False) -> int:
+        return 0 if results['status'] == 'pass' else 1
+    return None
+
+
+def run_batch_with_test_runner(staging: Path, slugs: List[str], quiet: bool = False):
+    """Grade every exercise staged under staging/<slug> in one `bin/run.py --batch` process,
+    or one container of it when not running inside the test runner's. The output of each
+    exercise goes to staging/.logs/<slug>.log."""
+    root = mount_point(staging, Path('/staging'))
+    (staging / '.logs').mkdir(exist_ok=True)
+    with (staging / 'manifest.jsonl').open('w') as manifest:
+        for slug in slugs:
+            job = {
+                'slug': slug,
+                'input': str(root / slug),
+                'output': str(root / slug),
+                'log': str(root / '.logs' / f'{slug}.log'),
+            }
+            manifest.write(json.dumps(job) + '\n')
+    run_test_runner(staging, root, ['--batch', root / 'manifest.jsonl'], **output_kwargs(quiet))
+
+
+def hash_files(digest, root: Path, paths):
+    for path in sorted(paths):
+        if path.is_file():
+            content = path.read_bytes()
+            digest.update(f'{path.relative_to(root)}\0{len(content)}\0'.encode())
+            digest.update(content)
+
+
+class ResultCache:
+    """Outcomes of checks, keyed by the hash of an exercise's staged files and of
+    everything else that goes into its check: the runner, its source and the
+    Python and pytest versions."""
+
+    def __init__(self, cache_dir: Path, runner: str, read: bool = True):
+        self.cache_dir = cache_dir
+        self.read = read
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        try:
+            pytest_version = metadata.version('pytest')
+        except metadata.PackageNotFoundError:
+            pytest_version = None
+        self.environment = hashlib.sha256(f'{runner}\0{sys.version}\0{pytest_version}\0'.encode())
+        if runner == 'test-runner':
+            source_dir = TEST_RUNNER_DIR if TEST_RUNNER_DIR.is_dir() else Path(__file__).resolve().parent.parent
+            hash_files(self.environment, source_dir,
+                       {path for pattern in RUNNER_SOURCES for path in source_dir.glob(pattern)})
+
+    def key(self, workdir: Path) -> str:
+        digest = self.environment.copy()
+        hash_files(digest, workdir, workdir.rglob('*'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[int]:
+        """The cached return value of a check, if any; with read off, there is none."""
+        try:
+            ret = int((self.cache_dir / key).read_text()) if self.read else None
+        except (OSError, ValueError):
+            ret = None
+        with self.lock:
+            if ret is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return ret
+
+    def put(self, key: str, ret: int):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=self.cache_dir, delete=False) as cache_file:
+            cache_file.write(str(0 if ret == 0 else 1))
+        os.replace(cache_file.name, self.cache_dir / key)
+
+
+def check_assignment(exercise: ExerciseInfo, runner: str = 'pytest', quiet: bool = False,
+                     output: Optional[IO] = None, cache: Optional[ResultCache] = None) -> int:
     ret = 1
     with tempfile.TemporaryDirectory(exercise.slug) as workdir:
         workdir = Path(workdir)
         copy_exercise_files(exercise, workdir)
-        ret = RUNNERS[runner](exercise, workdir, quiet=quiet)
+        key = cache.key(workdir) if cache is not None else None
+        ret = cache.get(key) if cache is not None else None
+        if ret is not None:
+            print('PASS (cached)' if ret == 0 else 'FAIL (cached)', file=output)
+        else:
+            ret = RUNNERS[runner](exercise, workdir, quiet=quiet, output=output)
+            if ret is None:
+                # the runner failed before checking anything: fail, but don't remember it
+                ret = 1
+            elif cache is not None:
+                cache.put(key, ret)
     return ret
 
 
+def check_exercise(exercise: ExerciseInfo, runner: str = 'pytest', quiet: bool = False,
+                   output: Optional[IO] = None, cache: Optional[ResultCache] = None) -> Optional[str]:
+    """Check an exercise, printing its report to output, and return its failure if any."""
+    failure = None
+    print('# ', exercise.slug, file=output, flush=True)
+    if not exercise.test_file:
+        print('FAIL: File with test cases not found', file=output)
+        failure = '{} (FileNotFound)'.format(exercise.slug)
+    elif check_assignment(exercise, runner=runner, quiet=quiet, output=output, cache=cache):
+        failure = '{} (TestFailed)'.format(exercise.slug)
+    if output is not None:
+        # the runner's subprocess wrote past where the file object was
+        output.seek(0, os.SEEK_END)
+    print('', file=output)
+    return failure
+
+
+def check_buffered(exercise: ExerciseInfo, runner: str = 'pytest', quiet: bool = False,
+                   cache: Optional[ResultCache] = None) -> Tuple[str, Optional[str]]:
+    """Check an exercise, returning its report instead of printing it, and its failure if any."""
+    with tempfile.TemporaryFile('w+') as output:
+        failure = check_exercise(exercise, runner=runner, quiet=quiet, output=output, cache=cache)
+        output.seek(0)
+        return output.read(), failure
+
+
+def check_batch(exercises: List[ExerciseInfo], quiet: bool = False, cache: Optional[ResultCache] = None) -> List[str]:
+    """Check exercises with the test runner in a single batch, and return their failures."""
+    with tempfile.TemporaryDirectory('test-exercises') as staging:
+        staging = Path(staging)
+        keys = {}
+        cached = {}
+        for exercise in exercises:
+            if exercise.test_file:
+                workdir = staging / exercise.slug
+                workdir.mkdir()
+                copy_exercise_files(exercise, workdir)
+                if cache is not None:
+                    keys[exercise.slug] = cache.key(workdir)
+                    ret = cache.get(keys[exercise.slug])
+                    if ret is not None:
+                        cached[exercise.slug] = ret
+        slugs = [e.slug for e in exercises if e.test_file and e.slug not in cached]
+        if slugs:
+            run_batch_with_test_runner(staging, slugs, quiet=quiet)
+
+        failures = []
+        for exercise in exercises:
+            print('# ', exercise.slug)
+            if not exercise.test_file:
+                print('FAIL: File with test cases not found')
+                failures.append('{} (FileNotFound)'.format(exercise.slug))
+                print('')
+                continue
+            if exercise.slug in cached:
+                ret = cached[exercise.slug]
+                print('PASS (cached)' if ret == 0 else 'FAIL (cached)')
+            else:
+                log = staging / '.logs' / f'{exercise.slug}.log'
+                if not quiet and log.is_file():
+                    print(log.read_text(), end='')
+                ret = results_outcome(staging / exercise.slug / 'results.json')
+                if ret is None:
+                    ret = 1
+                elif cache is not None:
+                    cache.put(keys[exercise.slug], ret)
+            if ret:
+                failures.append('{} (TestFailed)'.format(exercise.slug))
+            print('')
+    return failures
+
+
 def get_cli() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     runners = list(RUNNERS.keys())
@@ -168,12 +397,27 @@ def get_cli() -> argparse.ArgumentParser:
     parser.add_argument('--deprecated', action='store_true', help='include deprecated exercises', dest='include_deprecated')
     parser.add_argument('--wip', action='store_true', help='include WIP exercises', dest='include_wip')
     parser.add_argument('-r', '--runner', choices=runners, default=runners[0])
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of exercises to check at once (default: number of CPUs)')
+    parser.add_argument('--batch', action='store_true',
+                        help='with the test-runner runner, check all exercises in one runner process (and container)')
+    parser.add_argument('--workdir-root', type=Path,
+                        help='where to stage the exercises, eg. a tmpfs such as /dev/shm (default: the temp directory)')
+    parser.add_argument('--cache-dir', type=Path, default=CACHE_DIR,
+                        help=f'where the outcomes of checks are cached (default: {CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='check every exercise, even if unchanged since a cached check (the cache is still updated)')
     parser.add_argument('exercises', nargs='*')
     return parser
 
 
 def main():
-    opts = get_cli().parse_args()
+    parser = get_cli()
+    opts = parser.parse_args()
+    if opts.batch and opts.runner != 'test-runner':
+        parser.error('--batch requires --runner test-runner')
+    if opts.workdir_root is not None:
+        tempfile.tempdir = str(opts.workdir_root)
     config = Config.load()
     status_filter = {ExerciseStatus.Active, ExerciseStatus.Beta}
     if opts.include_deprecated:
@@ -196,19 +440,33 @@ def main():
                     print(f"unknown or disabled exercise '{slug}'")
             raise SystemExit(1)
 
+    # checked and reported in slug order, so that runs and their logs can be compared
+    exercises = sorted(exercises, key=lambda e: e.slug)
+
     print(f'TestEnvironment: {sys.executable.capitalize()}')
     print(f'Runner: {opts.runner}\n\n')
 
+    cache = ResultCache(opts.cache_dir, opts.runner, read=not opts.no_cache)
     failures = []
-    for exercise in exercises:
-        print('# ', exercise.slug)
-        if not exercise.test_file:
-            print('FAIL: File with test cases not found')
-            failures.append('{} (FileNotFound)'.format(exercise.slug))
-        else:
-            if check_assignment(exercise, runner=opts.runner, quiet=opts.quiet):
-                failures.append('{} (TestFailed)'.format(exercise.slug))
-        print('')
+    if opts.batch:
+        failures = check_batch(exercises, quiet=opts.quiet, cache=cache)
+    elif opts.jobs > 1:
+        # the checks run in subprocesses, so threads are enough to wait on them;
+        # their reports are printed in order as they complete
+        with ThreadPoolExecutor(opts.jobs) as executor:
+            checks = executor.map(
+                lambda e: check_buffered(e, runner=opts.runner, quiet=opts.quiet, cache=cache), exercises
+            )
+            for report, failure in checks:
+                print(report, end='', flush=True)
+                if failure is not None:
+                    failures.append(failure)
+    else:
+        for exercise in exercises:
+            failure = check_exercise(exercise, runner=opts.runner, quiet=opts.quiet, cache=cache)
+            if failure is not None:
+                failures.append(failure)
+    print(f'Cache: {cache.hits} hits, {cache.misses} misses\n')
 
     if failures:
         print('FAILURES: ', ', '.join(failures))
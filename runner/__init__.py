@@ -4,16 +4,55 @@ Test Runner for Python.
 import os
 import re
 from textwrap import dedent
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import json
 import shutil
+import sys
 
 import pytest
-
-from .data import Slug, Directory, Hierarchy, Results, Test
+from _pytest._code.code import Traceback
+
+from .bytecode import BytecodeCache
+from .capture import OutputLimit
+from .data import Slug, Directory, Hierarchy, Options, Results, Test
+from .events import EventStream, open_events
+from .limits import TimeLimits
+from .memory import MemoryLimit, MemoryTracer, limit_memory
+from .output import IncrementalResults, write_results
+from .parallel import ParallelRunner
+from .profiling import Profiler
 from .sort import TestOrder
-
+from .testindex import INDEX_FILE
+from .timing import Phases, Timings
+from .tracebacks import PrunedTracebacks, prune, truncate_message
+
+
+# the pytest configuration of lean runs, see Options.lean
+LEAN_INI = Path(__file__).resolve().with_name("lean.ini")
+
+# built-in pytest plugins that a run of the runner never needs
+LEAN_DISABLED_PLUGINS = (
+    "cacheprovider",
+    "doctest",
+    "faulthandler",
+    "freeze_support",
+    "junitxml",
+    "legacypath",
+    "pastebin",
+    "setuponly",
+    "setupplan",
+    "stepwise",
+    "threadexception",
+    "unraisableexception",
+)
+
+# arguments that keep pytest from writing its cache, see Options.read_only;
+# stepwise needs the cache
+READ_ONLY_ARGS = ["-p", "no:cacheprovider", "-p", "no:stepwise"]
+
+# the number of a variation in the name of a subtest
+VARIATION = re.compile(r"\[variation #(\d+)\]")
 
 
 class ResultsReporter:
@@ -21,8 +60,21 @@ class ResultsReporter:
         self.results = Results()
         self.tests = {}
         self.last_err = None
+        self.last_exception = None
         self.config = None
 
+        # names of the tests changed since runner.output last flushed them
+        self.updated = set()
+
+        # name of every collected test by node id, and the variations of
+        # each test by test name and variation number
+        self.names: Dict[str, str] = {}
+        self.variations: Dict[Tuple[str, int], Test] = {}
+
+        # names of the tests made from the reports of every test item, see
+        # runner.events
+        self.item_tests: Dict[str, List[str]] = {}
+
     def pytest_configure(self, config):
         config.addinivalue_line("markers", "task(taskno): this marks the exercise task number.")
         self.config = config
@@ -34,13 +86,15 @@ class ResultsReporter:
         for item in items:
             test_id = Hierarchy(item.nodeid)
             name = '.'.join(test_id.split("::")[1:])
+            self.names[item.nodeid] = name
 
             for mark in item.iter_markers(name='task'):
                 self.tests[name] = Test(name=name, task_id=mark.kwargs['taskno'])
+                self.item_tests[item.nodeid] = [name]
 
         def _sort_by_lineno(item):
             test_id = Hierarchy(item.nodeid)
-            source = Path(item.fspath)
+            source = Path(item.path)
             return TestOrder.lineno(test_id, source)
 
         items.sort(key=_sort_by_lineno)
@@ -50,7 +104,10 @@ class ResultsReporter:
         Process a test setup / call / teardown report.
         """
 
-        name = ".".join(report.nodeid.split("::")[1:])
+        parent = self.names.get(report.nodeid)
+        if parent is None:
+            parent = ".".join(report.nodeid.split("::")[1:])
+        name = parent
         if report.head_line:
             name = report.head_line.split(" (")[0]
 
@@ -58,13 +115,28 @@ class ResultsReporter:
         #Add variation name to test output.
         if name not in self.tests:
             self.tests[name] = Test(name)
+            self.item_tests.setdefault(report.nodeid, []).append(name)
+            variation = VARIATION.search(name)
+            if variation:
+                self.variations[parent, int(variation.group(1))] = self.tests[name]
 
         state = self.tests[name]
 
+        # time taken by this stage, see runner.timing
+        if getattr(report, "cpu_ms", None) is not None:
+            state.add_time(report.duration * 1000, report.cpu_ms)
+
+        # memory allocated by the test, see runner.memory
+        if getattr(report, "memory_peak_bytes", None) is not None:
+            state.memory_peak_bytes = report.memory_peak_bytes
+            state.memory_sites = report.memory_sites
+
         # ignore successful setup and teardown stages
         if report.passed and report.when != "call":
             return
 
+        self.updated.add(name)
+
         #Update tests that have already failed with capstdout and return.
         if not state.is_passing():
 
@@ -87,16 +159,13 @@ class ResultsReporter:
                         parsed_captures.append(item.lstrip('u'))
                     else: parsed_captures.append(item)
 
-                # Generate variation numbers for each subtest output section.
-                variants = (f'[variation #{number}]: {item}' for
-                            item, number in zip(parsed_captures, range(1, len(parsed_captures)+1)))
-
-                # Go through the variations and match them to self.tests.
-                # Insert matched variation output into test output field.
-                for item in variants:
-                    for name in self.tests:
-                        if item.split(":")[0] in name and report.nodeid.split("::")[2] in name:
-                            self.tests[name].output = item.split("]: ")[1]
+                # Insert each subtest output section into the output field
+                # of the variation with its number.
+                for number, item in enumerate(parsed_captures, start=1):
+                    variation = self.variations.get((parent, number))
+                    if variation is not None:
+                        variation.output = item
+                        self.updated.add(variation.name)
             else:
                 state.output = report.capstdout
             return
@@ -113,22 +182,28 @@ class ResultsReporter:
                 crash = report.longrepr.reprcrash
                 message = self._make_message(trace, crash)
 
+            # test ran out of time or memory or took its worker down, see
+            # runner.limits, runner.memory and runner.parallel
+            if getattr(report, "runner_error", None):
+                state.error(report.runner_error)
+
             # test failed due to a setup / teardown error
-            if report.when != "call":
+            elif report.when != "call":
                 state.error(message)
             else:
                 state.fail(message)
 
         test_id = Hierarchy(report.nodeid)
-        source = Path(self.config.rootdir) / report.fspath
+        source = self.config.rootpath / report.fspath
         state.test_code = TestOrder.function_source(test_id, source)
 
 
         # Looks up test_ids from parent when the test is a subtest.
         if state.task_id == 0 and 'variation' in state.name:
-            parent_test_name = state.name.split(' ')[0]
+            parent_test_name = parent
             parent_task_id = self.tests[parent_test_name].task_id
             state.task_id = parent_task_id
+            self.updated.add(parent_test_name)
 
 
             # Changes status of parent to fail if any of the subtests fail.
@@ -156,7 +231,9 @@ class ResultsReporter:
         # an error has been encountered
         elif exitcode is not pytest.ExitCode.OK:
             message = None
-            if self.last_err is not None:
+            if self.last_exception is not None:
+                message = self._exception_message(*self.last_exception)
+            elif self.last_err is not None:
                 message = self.last_err
             else:
                 message = f"Unexpected ExitCode.{exitcode.name}: check logs for details"
@@ -175,18 +252,32 @@ class ResultsReporter:
         """
         Catch the last exception handled in case the test run itself errors.
         """
-        if report.outcome == "failed":
-            excinfo = call.excinfo
-            err = excinfo.getrepr(style="no", abspath=False)
+        # ran out of memory while loading the tests, see runner.memory
+        if getattr(report, "runner_error", None):
+            self.last_err = report.runner_error
+            self.last_exception = None
+
+        # only made into a message if the run errors, which most don't; the
+        # failures of tests are reported by the tests, and keeping their
+        # exceptions would keep their frames alive for the rest of the run
+        elif report.outcome == "failed" and isinstance(node, pytest.Collector):
+            self.last_exception = (node.name, call.excinfo)
+
+    def _exception_message(self, name, excinfo):
+        """
+        Make a message of an exception caught by pytest_exception_interact.
+        """
+        excinfo.traceback = Traceback(prune(excinfo.tb))
+        err = excinfo.getrepr(style="no", abspath=False)
 
-            # trim off full traceback for first two exercises to be friendlier and clearer
-            if ('lasagna' in node.name or 'hello_world' in node.name) and 'ImportError' in str(err.chain[0]):
-                trace = err.chain[-2][0]
-            else:
-                trace = err.chain[-1][0]
+        # trim off full traceback for first two exercises to be friendlier and clearer
+        if ('lasagna' in name or 'hello_world' in name) and 'ImportError' in str(err.chain[0]):
+            trace = err.chain[-2][0]
+        else:
+            trace = err.chain[-1][0]
 
-            crash = err.chain[0][1]
-            self.last_err = self._make_message(trace, crash)
+        crash = err.chain[0][1]
+        return self._make_message(trace, crash)
 
     def _make_message(self, trace, crash=None):
         """
@@ -200,7 +291,7 @@ class ResultsReporter:
         if crash:
             common = os.path.commonpath([Path.cwd(), Path(crash.path)])
             message = message.replace(common, ".")
-        return message
+        return truncate_message(message)
 
 
 def _sanitize_args(args: List[str]) -> List[str]:
@@ -220,32 +311,114 @@ def _sanitize_args(args: List[str]) -> List[str]:
     return clean
 
 
-def run(slug: Slug, indir: Directory, outdir: Directory, args: List[str]) -> None:
+def _lean_args(indir: Directory, test_files: List[Path]) -> List[str]:
     """
-    Run the tests for the given exercise and produce a results.json.
+    Arguments that start pytest with only the plugins a run needs, and with
+    its configuration pinned instead of discovered from the filesystem.
+    """
+    args = ["--disable-plugin-autoload", "-c", str(LEAN_INI), f"--rootdir={indir}"]
+    for name in LEAN_DISABLED_PLUGINS:
+        args += ["-p", f"no:{name}"]
+
+    for test_file in test_files:
+        if test_file.is_file() and "subTest" in test_file.read_text():
+            args += ["-p", "pytest_subtests.plugin"]
+            break
+    return args
+
+
+def find_test_files(slug: Slug, indir: Directory) -> List[Path]:
     """
-    test_files = []
+    Find the test files of the given exercise.
+    """
+    files = []
     config_file = indir.joinpath(".meta").joinpath("config.json")
 
     if config_file.is_file():
         config_data = json.loads(config_file.read_text())
         for filename in config_data.get('files', {}).get('test', []):
-            test_files.append(indir.joinpath(filename))
+            files.append(indir.joinpath(filename))
+
+    if not files:
+        files.append(indir.joinpath(slug.replace("-", "_") + "_test.py"))
+    return files
 
-    if not test_files:
-        test_files.append(indir.joinpath(slug.replace("-", "_") + "_test.py"))
 
+def run(
+    slug: Slug,
+    indir: Directory,
+    outdir: Directory,
+    args: List[str],
+    options: Optional[Options] = None,
+    phases: Optional[Phases] = None,
+) -> None:
+    """
+    Run the tests for the given exercise and produce a results.json.
+    """
+    options = options or Options()
+    phases = phases or Phases()
     out_file = outdir.joinpath("results.json")
 
     # run the tests and report
     reporter = ResultsReporter()
-    pytest.main(_sanitize_args(args or []) + [str(tf) for tf in test_files], plugins=[reporter])
+    plugins = [reporter, phases, OutputLimit(options.output_limit), PrunedTracebacks()]
+    limits = None
+    if options.timeout is not None or options.run_timeout is not None:
+        limits = TimeLimits(options)
+        plugins.append(limits)
+    if options.cache_dir is not None:
+        plugins.append(BytecodeCache(options.cache_dir.joinpath("bytecode")))
+        TestOrder.use_index(options.cache_dir.joinpath(INDEX_FILE))
+    if options.memory_limit is not None:
+        plugins.append(MemoryLimit(options.memory_limit))
+    if options.incremental:
+        plugins.append(IncrementalResults(out_file, reporter.tests, reporter.updated))
+    timings = Timings() if options.timings else None
+    if timings is not None:
+        plugins.append(timings)
+    test_files = find_test_files(slug, indir)
+    if options.profile or options.trace_memory:
+        solution_files = [path for path in indir.rglob("*.py") if path not in test_files]
+        if options.profile:
+            plugins.append(Profiler(outdir, solution_files, options.profile_top, options.profile_raw))
+        else:
+            plugins.append(MemoryTracer(solution_files))
+    events = None
+    if options.events:
+        events = EventStream(open_events(options.events), reporter.results, reporter.tests, reporter.item_tests)
+        plugins.append(events)
+    if options.jobs > 1:
+        # only the parent may report, see runner.parallel
+        reporting = [
+            plugin for plugin in plugins if isinstance(plugin, (ResultsReporter, IncrementalResults, EventStream))
+        ]
+        plugins.append(ParallelRunner(options.jobs, parent_only=reporting, limits=limits))
+    lean_args = _lean_args(indir, test_files) if options.lean else []
+    read_only_args = READ_ONLY_ARGS if options.read_only else []
+    dont_write_bytecode = sys.dont_write_bytecode
+    sys.dont_write_bytecode = dont_write_bytecode or options.read_only
+    try:
+        with limit_memory(options.memory_limit):
+            pytest.main(
+                lean_args + read_only_args + _sanitize_args(args or []) + [str(tf) for tf in test_files],
+                plugins=plugins,
+            )
+    finally:
+        sys.dont_write_bytecode = dont_write_bytecode
+    if events is not None:
+        events.close()
+    phases.mark("pytest teardown")
+    if timings is not None:
+        reporter.results.timing = timings.summary(phases)
 
     # dump the report
-    out_file.write_text(reporter.results.as_json())
-
-    # remove cache directories
-    for cache_dir in ['.pytest_cache', '__pycache__']:
-        dirpath = indir / cache_dir
-        if dirpath.is_dir() and dirpath.owner() == out_file.owner():
-            shutil.rmtree(dirpath)
+    write_results(out_file, reporter.results, None if options.compact else 2)
+    phases.mark("results")
+
+    # remove cache directories, unless none were written
+    if not options.read_only:
+        for cache_dir in ['.pytest_cache', '__pycache__']:
+            dirpath = indir / cache_dir
+            if dirpath.is_dir() and dirpath.owner() == out_file.owner():
+                shutil.rmtree(dirpath)
+    phases.mark("cache cleanup")
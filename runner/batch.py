@@ -0,0 +1,123 @@
+"""
+Batch mode for the Python test runner.
+
+Grades every job of a JSONL manifest in one warm process, forking a fresh
+child per job, and writes an aggregate summary of the whole batch.
+"""
+import gc
+import json
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List
+
+from . import find_test_files, utils
+from .data import Options
+from .serve import Job, fork_job, preload
+from .sort import TestOrder
+
+
+def load_manifest(manifest: Path) -> List[Dict[str, Any]]:
+    """
+    Read the jobs of a manifest, one JSON object with slug, input, output
+    and optional args and log per line.
+    """
+    with manifest.open() as lines:
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def _job(request: Dict[str, Any], options: Options) -> Job:
+    return Job(
+        utils.slug(request["slug"]),
+        utils.directory(request["input"]),
+        utils.directory(request["output"]),
+        request.get("args", []),
+        options,
+    )
+
+
+def _prime(job: Job) -> None:
+    """
+    Index the job's test files in the parent, so every job of the same
+    exercise inherits the parsed test order instead of re-parsing it.
+    """
+    try:
+        for test_file in find_test_files(job.slug, job.indir):
+            TestOrder.index(test_file)
+    except (OSError, SyntaxError, ValueError):
+        # the child reports broken test files itself
+        pass
+
+
+def _run_job(request: Dict[str, Any], options: Options) -> Dict[str, Any]:
+    summary = {key: request.get(key) for key in ("slug", "input", "output")}
+    try:
+        job = _job(request, options)
+    except (KeyError, ValueError, OSError) as err:
+        summary.update(ok=False, message=str(err))
+        return summary
+
+    _prime(job)
+
+    # a child that dies must not leave the status of an earlier run of the
+    # same output directory behind, so a results.json is only ever this job's
+    results_file = job.outdir.joinpath("results.json")
+    results_file.unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    log = request.get("log")
+    summary.update(fork_job(job, Path(log) if log else None))
+    summary["seconds"] = time.perf_counter() - start
+
+    if results_file.is_file():
+        results = json.loads(results_file.read_text())
+        summary["status"] = results["status"]
+        if options.trace_memory:
+            peaks = [test["memory_peak_bytes"] for test in results["tests"] if "memory_peak_bytes" in test]
+            summary["memory_peak_bytes"] = max(peaks, default=0)
+    return summary
+
+
+def memory_by_exercise(jobs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate the peak memory of the jobs of each exercise, see --trace-memory.
+    """
+    peaks = defaultdict(list)
+    for job in jobs:
+        if "memory_peak_bytes" in job:
+            peaks[job["slug"]].append(job["memory_peak_bytes"])
+    return {
+        slug: {"jobs": len(values), "max_peak_bytes": max(values), "median_peak_bytes": median(values)}
+        for slug, values in sorted(peaks.items())
+    }
+
+
+def batch(manifest: Path, summary_file: Path, options: Options) -> Dict[str, Any]:
+    """
+    Run every job in the manifest with the given options and write the
+    aggregate summary.
+    """
+    preload()
+    gc.freeze()
+
+    # keep jobs of the same exercise together
+    requests = sorted(load_manifest(manifest), key=lambda request: str(request.get("slug")))
+
+    start = time.perf_counter()
+    jobs = [_run_job(request, options) for request in requests]
+    seconds = time.perf_counter() - start
+
+    summary = {
+        "jobs": len(jobs),
+        "seconds": seconds,
+        "jobs_per_second": len(jobs) / seconds if seconds else 0.0,
+        "statuses": Counter(job.get("status", "missing") for job in jobs),
+        "results": jobs,
+    }
+    if options.trace_memory:
+        summary["memory"] = memory_by_exercise(jobs)
+    summary_file.write_text(json.dumps(summary, indent=2))
+
+    print(f"{len(jobs)} jobs in {seconds:.2f}s ({summary['jobs_per_second']:.1f} jobs/s)")
+    return summary
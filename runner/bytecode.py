@@ -0,0 +1,108 @@
+"""
+Shared cache of assertion-rewritten test modules.
+
+Test files are the same for every solution of an exercise, so instead of
+pytest's per-directory __pycache__ the rewritten code objects are kept in a
+cache outside the solution directory, keyed by the hash of the test file's
+contents and the Python and pytest versions. The cache is populated for a
+whole track ahead of time with bin/build_cache.py; runs only read it.
+"""
+import ast
+import hashlib
+import marshal
+import os
+import sys
+from pathlib import Path
+from types import CodeType
+from typing import Optional
+
+import pytest
+from _pytest.assertion import rewrite as rewrite_module
+
+
+def cache_key(source: bytes, pass_hook: bool = False) -> str:
+    """
+    Key of a test file's rewritten code.
+    """
+    digest = hashlib.sha256(source)
+    digest.update(f"{sys.version}|{pytest.__version__}|{pass_hook}".encode())
+    return digest.hexdigest()
+
+
+def rewrite(source: bytes, filename: str, config=None) -> CodeType:
+    """
+    Compile a test file's source with its asserts rewritten.
+    """
+    tree = ast.parse(source, filename=filename)
+    rewrite_module.rewrite_asserts(tree, source, filename, config)
+    return compile(tree, filename, "exec", dont_inherit=True)
+
+
+def relocate(code: CodeType, filename: str) -> CodeType:
+    """
+    Point a cached code object and all code nested in it at the given file.
+    """
+    consts = tuple(relocate(const, filename) if isinstance(const, CodeType) else const for const in code.co_consts)
+    return code.replace(co_filename=filename, co_consts=consts)
+
+
+def load(cache_dir: Path, key: str) -> Optional[CodeType]:
+    """
+    Read cached code, if any.
+    """
+    try:
+        return marshal.loads(cache_dir.joinpath(f"{key}.pyc").read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def store(cache_dir: Path, key: str, code: CodeType) -> None:
+    """
+    Cache code atomically; a read-only cache is left alone.
+    """
+    pyc = cache_dir.joinpath(f"{key}.pyc")
+    temp = pyc.with_name(f".{pyc.name}.{os.getpid()}")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temp.write_bytes(marshal.dumps(code))
+        os.replace(temp, pyc)
+    except OSError:
+        temp.unlink(missing_ok=True)
+
+
+class BytecodeCache:
+    """
+    Points pytest's assertion rewriting import hook at the shared cache for
+    the duration of a run.
+
+    Only the hook's pyc helpers are replaced, so tracebacks through the hook
+    look exactly as they do without the cache.
+
+    Runs only ever read the cache: they run the student's code, and code
+    they could store would be run by every other student's tests. The
+    cache must be read-only for the runner.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+        self.pass_hook = False
+        self.patch = pytest.MonkeyPatch()
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_configure(self, config):
+        self.pass_hook = bool(config.getini("enable_assertion_pass_hook"))
+        self.patch.setattr(rewrite_module, "_read_pyc", self._read_pyc)
+        self.patch.setattr(rewrite_module, "_write_pyc", self._write_pyc)
+
+    def pytest_unconfigure(self, config):
+        self.patch.undo()
+
+    def _read_pyc(self, source: Path, pyc: Path, trace=None) -> Optional[CodeType]:
+        code = load(self.cache_dir, cache_key(source.read_bytes(), self.pass_hook))
+        return None if code is None else relocate(code, str(source))
+
+    @staticmethod
+    def _write_pyc(*args) -> bool:
+        # test files missing from the cache are rewritten on every run, as
+        # only bin/build_cache.py stores code in it
+        return True
@@ -0,0 +1,171 @@
+"""
+Capturing the output of the tests with a bound on what is kept.
+
+Only the first 500 characters of a test's output end up in results.json, but
+pytest keeps everything a test prints until the test is reported. A solution
+printing in a tight loop would make every run read back (and hold on to)
+all of it, so the output is dropped as it is written once a limit is reached.
+"""
+import io
+from typing import Dict, Iterator, List, Tuple
+
+import pytest
+from _pytest import capture as capture_module
+from _pytest.capture import EncodedFile, FDCapture, MultiCapture, SysCapture
+
+
+class BoundedFile(io.RawIOBase):
+    """
+    A capture file that keeps at most limit bytes of every stretch of
+    output written through it and counts the bytes it drops.
+
+    A stretch is ended by end_stretch, which also writes the last byte
+    dropped from it, if any. The output of a test is split into the output
+    of its subtests on the progress the terminal reporter writes after each
+    subtest, preceded by a newline, so a stretch must end as it would have.
+    """
+
+    def __init__(self, file: io.FileIO, limit: int) -> None:
+        super().__init__()
+        self.file = file
+        self.limit = limit
+        self.kept = 0
+        self.dropped = 0
+        self.tail = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def readinto(self, buffer) -> int:
+        return self.file.readinto(buffer)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def truncate(self, size=None) -> int:
+        return self.file.truncate(size)
+
+    def _write(self, data) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[self.file.write(view) :]
+
+    def write(self, data) -> int:
+        length = len(data)
+        keep = min(length, self.limit - self.kept)
+        if keep < length:
+            self.dropped += length - keep
+            self.tail = bytes(data[-1:])
+        if keep > 0:
+            self._write(memoryview(data)[:keep])
+            self.kept += keep
+        return length
+
+    def end_stretch(self) -> None:
+        """
+        Start a new stretch of output.
+        """
+        if self.tail:
+            self._write(self.tail)
+        self.kept = 0
+        self.tail = b""
+
+    def close(self) -> None:
+        self.file.close()
+        super().close()
+
+
+class BoundedFDCapture(FDCapture):
+    """
+    pytest's capture of a file descriptor, writing through a BoundedFile.
+    """
+
+    def __init__(self, targetfd: int, limit: int) -> None:
+        super().__init__(targetfd)
+        self.bounded = BoundedFile(self.tmpfile.detach(), limit)
+        self.tmpfile = EncodedFile(
+            self.bounded, encoding="utf-8", errors="replace", newline="", write_through=True,
+        )
+        self.syscapture = SysCapture(targetfd, self.tmpfile)
+        self.snapped = 0
+
+    def snap(self) -> str:
+        self.bounded.end_stretch()
+        self.snapped += self.bounded.dropped
+        self.bounded.dropped = 0
+        return super().snap()
+
+
+class OutputLimit:
+    """
+    Makes pytest capture stdout and stderr through BoundedFDCapture.
+
+    The number of bytes dropped from the output of a stage of a test is
+    put on its report as `output_dropped_bytes`, and listed at the end of
+    the terminal summary.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.patch = pytest.MonkeyPatch()
+        self.get_multicapture = capture_module._get_multicapture
+        self.captures: Dict[int, BoundedFDCapture] = {}
+        self.dropped: List[Tuple[str, str, int]] = []
+
+    def _get_multicapture(self, method):
+        if method != "fd":
+            return self.get_multicapture(method)
+        self.captures = {targetfd: BoundedFDCapture(targetfd, self.limit) for targetfd in (1, 2)}
+        return MultiCapture(in_=FDCapture(0), out=self.captures[1], err=self.captures[2])
+
+    @pytest.hookimpl(wrapper=True, tryfirst=True)
+    def pytest_load_initial_conftests(self, early_config) -> Iterator[None]:
+        # the global capture is started by the capture plugin's own wrapper;
+        # capfd and capsys are left alone
+        self.patch.setattr(capture_module, "_get_multicapture", self._get_multicapture)
+        return (yield)
+
+    def pytest_unconfigure(self, config):
+        self.patch.undo()
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        for capture in self.captures.values():
+            capture.snapped = 0
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        dropped = sum(capture.snapped for capture in self.captures.values())
+        if dropped:
+            report.output_dropped_bytes = dropped
+            for capture in self.captures.values():
+                capture.snapped = 0
+        return report
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_logreport(self, report):
+        # before the terminal reporter writes the progress of a subtest
+        for capture in self.captures.values():
+            capture.bounded.end_stretch()
+        dropped = getattr(report, "output_dropped_bytes", None)
+        if dropped:
+            self.dropped.append((report.nodeid, report.when, dropped))
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.dropped:
+            return
+        terminalreporter.section(f"output dropped past {self.limit} bytes")
+        for nodeid, when, dropped in self.dropped:
+            terminalreporter.write_line(f"{nodeid} ({when}): {dropped} bytes")
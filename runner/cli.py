@@ -0,0 +1,245 @@
+"""
+Command line arguments of the test runner, shared by bin/run.py and the daemon.
+"""
+import os
+from argparse import ArgumentParser, ArgumentTypeError, Namespace, REMAINDER
+from pathlib import Path
+
+from . import utils
+from .data import MIN_OUTPUT_LIMIT, Options
+
+
+def _slug(arg):
+    try:
+        return utils.slug(arg)
+    except ValueError as err:
+        raise ArgumentTypeError(str(err))
+
+
+def _directory(arg):
+    try:
+        return utils.directory(arg)
+    except (FileNotFoundError, PermissionError) as err:
+        raise ArgumentTypeError(str(err))
+
+
+def _seconds(arg):
+    seconds = float(arg)
+    if seconds <= 0:
+        raise ArgumentTypeError(f"must be a positive number of seconds: {arg!r}")
+    return seconds
+
+
+def _count(arg):
+    count = int(arg)
+    if count < 1:
+        raise ArgumentTypeError(f"must be a positive number: {arg!r}")
+    return count
+
+
+def _output_limit(arg):
+    limit = int(arg)
+    if limit < MIN_OUTPUT_LIMIT:
+        raise ArgumentTypeError(f"must be at least {MIN_OUTPUT_LIMIT} bytes: {arg!r}")
+    return limit
+
+
+def build_parser() -> ArgumentParser:
+    """
+    Build the parser for the runner's CLI.
+    """
+    parser = ArgumentParser(description="Run the tests of a Python exercise.")
+
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        type=Path,
+        help="keep running and serve requests from bin/client.py on this Unix socket",
+    )
+
+    parser.add_argument(
+        "--fork",
+        action="store_true",
+        help="with --serve, run every request in a freshly forked child of the warm daemon",
+    )
+
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        type=Path,
+        help="run every job of a JSONL manifest of slug / input / output objects",
+    )
+
+    parser.add_argument(
+        "--summary",
+        metavar="FILE",
+        type=Path,
+        help="where --batch writes its summary (default: MANIFEST.summary.json)",
+    )
+
+    parser.add_argument(
+        "--timeout",
+        metavar="SECONDS",
+        type=_seconds,
+        help="time limit of each individual test",
+    )
+
+    parser.add_argument(
+        "--run-timeout",
+        metavar="SECONDS",
+        type=_seconds,
+        help="time limit of the whole test run",
+    )
+
+    parser.add_argument(
+        "--wall-clock",
+        action="store_true",
+        help="measure time limits in wall-clock rather than CPU seconds",
+    )
+
+    parser.add_argument(
+        "--memory-limit",
+        metavar="MB",
+        type=_count,
+        help="limit of the runner's address space in megabytes",
+    )
+
+    parser.add_argument(
+        "--output-limit",
+        metavar="BYTES",
+        type=_output_limit,
+        default=Options.output_limit,
+        help="bytes of output to keep of every test or subtest, the rest is dropped while it is written "
+        f"(at least {MIN_OUTPUT_LIMIT}, default: {Options.output_limit})",
+    )
+
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="write results.json without indentation",
+    )
+
+    parser.add_argument(
+        "--events",
+        metavar="PATH|fd:N",
+        help="stream a JSON line for every collected test, finished test and the end of the run "
+        "to a file, named pipe or open file descriptor",
+    )
+
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="report the wall-clock and CPU time of every test and of the run in results.json",
+    )
+
+    # both measure the solution through sys.setprofile
+    measure = parser.add_mutually_exclusive_group()
+
+    measure.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile every test and write the solution's hottest functions to profile.txt in OUT",
+    )
+
+    measure.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="report the peak memory allocated by every test and the solution lines holding the most",
+    )
+
+    parser.add_argument(
+        "--profile-top",
+        metavar="N",
+        type=_count,
+        default=10,
+        help="number of functions to list per test with --profile (default: 10)",
+    )
+
+    parser.add_argument(
+        "--profile-raw",
+        action="store_true",
+        help="with --profile, also dump every test's full profile to OUT/profile/ for pstats",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="rewrite results.json after every test so a crashed run keeps finished tests",
+    )
+
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="skip plugin autoloading and unneeded built-in plugins, and pin pytest's configuration",
+    )
+
+    parser.add_argument(
+        "--read-only",
+        action="store_true",
+        help="write no bytecode or pytest cache to IN, so that it can be mounted read-only",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        type=Path,
+        default=os.environ.get("RUNNER_CACHE_DIR"),
+        help="shared cache of rewritten test modules, built by bin/build_cache.py "
+        "(default: $RUNNER_CACHE_DIR)",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        metavar="N",
+        type=_count,
+        default=1,
+        help="run the tests of the exercise in N processes",
+    )
+
+    parser.add_argument(
+        "slug", metavar="SLUG", nargs="?", type=_slug, help="name of the exercise to process",
+    )
+
+    parser.add_argument(
+        "input",
+        metavar="IN",
+        nargs="?",
+        type=_directory,
+        help="directory where the [EXERCISE.py] file is located",
+    )
+
+    parser.add_argument(
+        "output",
+        metavar="OUT",
+        nargs="?",
+        type=_directory,
+        help="directory where the results.json will be written",
+    )
+
+    parser.add_argument("pytest_args", nargs=REMAINDER)
+    return parser
+
+
+def get_options(args: Namespace) -> Options:
+    """
+    Collect the options of a test run from parsed arguments.
+    """
+    return Options(
+        timeout=args.timeout,
+        run_timeout=args.run_timeout,
+        wall_clock=args.wall_clock,
+        memory_limit=args.memory_limit,
+        incremental=args.incremental,
+        lean=args.lean,
+        cache_dir=args.cache_dir,
+        jobs=args.jobs,
+        timings=args.timings,
+        profile=args.profile,
+        profile_top=args.profile_top,
+        profile_raw=args.profile_raw,
+        trace_memory=args.trace_memory,
+        output_limit=args.output_limit,
+        compact=args.compact,
+        events=args.events,
+        read_only=args.read_only,
+    )
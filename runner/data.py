@@ -1,10 +1,12 @@
 """
 Datatypes to support the Python test runner.
 """
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields
 from enum import Enum, auto
+from io import StringIO
 from json import JSONEncoder, dumps
-from typing import Any, List, NewType, Optional
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable, Iterator, List, NewType, Optional, TextIO, Tuple
 from pathlib import Path
 from re import compile, match, sub
 
@@ -17,6 +19,13 @@ Directory = NewType("Directory", Path)
 # a Pytest-style hierarchy, ./file.py::Class::test_function
 Hierarchy = NewType("Hierarchy", str)
 
+# the characters of a test's output shown in results.json
+MAX_OUTPUT = 500
+
+# the fewest bytes of output to keep of a test: enough for MAX_OUTPUT characters
+# of up to 4 bytes in UTF-8, so that a longer output is still truncated with a message
+MIN_OUTPUT_LIMIT = 4096
+
 
 class Status(Enum):
     """
@@ -32,6 +41,68 @@ class Status(Enum):
 Message = Optional[str]
 Output = Optional[str]
 
+# the TestClass name and test_ prefix of a test name
+TRIM_NAME = compile(r'^(.+)(Test\.test_)')
+
+
+@dataclass
+class Options:
+    """
+    Optional behaviour of a test run.
+    """
+
+    # time limits in seconds of each test and of the whole run
+    timeout: Optional[float] = None
+    run_timeout: Optional[float] = None
+
+    # measure the time limits in wall-clock rather than CPU seconds
+    wall_clock: bool = False
+
+    # limit of the runner's address space in megabytes, see runner.memory
+    memory_limit: Optional[int] = None
+
+    # rewrite results.json after every test, see runner.output
+    incremental: bool = False
+
+    # start pytest with the minimal set of plugins and a pinned configuration
+    lean: bool = False
+
+    # shared cache of test file artifacts, see runner.bytecode
+    cache_dir: Optional[Path] = None
+
+    # number of processes to spread the tests over, see runner.parallel
+    jobs: int = 1
+
+    # report the time taken by every test and by the run, see runner.timing
+    timings: bool = False
+
+    # profile the solution during every test, see runner.profiling
+    profile: bool = False
+    profile_top: int = 10
+    profile_raw: bool = False
+
+    # report the memory allocated by every test, see runner.memory
+    trace_memory: bool = False
+
+    # bytes of output kept of a test or subtest, see runner.capture
+    output_limit: int = 64 * 1024
+
+    # write results.json without indentation, see Results.write
+    compact: bool = False
+
+    # where to stream the events of the run to, see runner.events
+    events: Optional[str] = None
+
+    # write nothing to the input directory, so that it can be mounted read-only
+    read_only: bool = False
+
+    def __post_init__(self) -> None:
+        # both measure the solution through sys.setprofile
+        if self.profile and self.trace_memory:
+            raise ValueError("profile and trace_memory can't be combined")
+        if self.output_limit < MIN_OUTPUT_LIMIT:
+            raise ValueError(f"output_limit must be at least {MIN_OUTPUT_LIMIT} bytes")
+
 
 @dataclass
 class TestInfo:
@@ -39,6 +110,9 @@ class TestInfo:
     end_lineno: int
     variants: int
 
+    # the dedented source of the test, reported as its test_code
+    source: str
+
 
 @dataclass
 class Test:
@@ -57,6 +131,14 @@ class Test:
     output: Output = None
     _output: Output = field(default=None, init=False, repr=False)
 
+    # wall-clock and CPU time of the test, only reported with --timings
+    duration_ms: Optional[float] = None
+    cpu_ms: Optional[float] = None
+
+    # memory allocated by the test, only reported with --trace-memory
+    memory_peak_bytes: Optional[int] = None
+    memory_sites: Optional[List[Dict[str, Any]]] = None
+
     def _update(self, status: Status, message: Message = None) -> None:
         self.status = status
 
@@ -80,11 +162,18 @@ class Test:
 
         captured = captured.strip()
 
-        truncate_msg = " [Output was truncated. Please limit to 500 chars]"
-        if len(captured) > 500:
-            captured = captured[: 500 - len(truncate_msg)] + truncate_msg
+        truncate_msg = f" [Output was truncated. Please limit to {MAX_OUTPUT} chars]"
+        if len(captured) > MAX_OUTPUT:
+            captured = captured[: MAX_OUTPUT - len(truncate_msg)] + truncate_msg
         self._output = captured
 
+    def add_time(self, duration_ms: float, cpu_ms: float) -> None:
+        """
+        Add the time taken by one stage of this test.
+        """
+        self.duration_ms = round((self.duration_ms or 0) + duration_ms, 3)
+        self.cpu_ms = round((self.cpu_ms or 0) + cpu_ms, 3)
+
     def fail(self, message: Message = None) -> None:
         """
         Indicate this test failed.
@@ -105,6 +194,46 @@ class Test:
         return self.status is Status.PASS
 
 
+# names of the fields of each serialized dataclass, see Results._items
+_FIELDS: Dict[type, Tuple[str, ...]] = {}
+
+
+class _Layout:
+    """
+    How json.dumps lays out values with a given indent.
+    """
+
+    def __init__(self, indent: Optional[int]) -> None:
+        self.indent = indent
+        self.separators = (",", ":") if indent is None else (",", ": ")
+        self.keys: Dict[str, str] = {}
+
+    def newline(self, level: int) -> str:
+        return "" if self.indent is None else "\n" + " " * (self.indent * level)
+
+    def key(self, key: str) -> str:
+        if key not in self.keys:
+            self.keys[key] = encode_basestring_ascii(key) + self.separators[1]
+        return self.keys[key]
+
+    def value(self, value: Any, level: int) -> str:
+        if isinstance(value, str):
+            return encode_basestring_ascii(value)
+        if type(value) is int:  # pylint: disable=unidiomatic-typecheck
+            return int.__repr__(value)
+        if isinstance(value, Status):
+            return f'"{value.name.lower()}"'
+        text = dumps(value, indent=self.indent, separators=self.separators)
+        return text if self.indent is None else text.replace("\n", self.newline(level))
+
+    def object(self, items: Iterable[Tuple[str, Any]], level: int) -> str:
+        members = [self.key(key) + self.value(value, level + 1) for key, value in items]
+        if not members:
+            return "{}"
+        inner = self.newline(level + 1)
+        return "{" + inner + ("," + inner).join(members) + self.newline(level) + "}"
+
+
 @dataclass
 class Results:
     """
@@ -116,6 +245,9 @@ class Results:
     message: Message = None
     tests: List[Test] = field(default_factory=list)
 
+    # run-level timings, only reported with --timings
+    timing: Optional[Dict[str, float]] = None
+
     def add(self, test: Test) -> None:
         """
         Add a Test to the list of tests.
@@ -139,45 +271,91 @@ class Results:
         self.message = message
 
     @staticmethod
-    def _factory(items):
-        result = {}
-        for key, value in items:
-            if key == "_output" or key in {"message", "output", "subtest"} and value in (None, "", " "):
-                continue
+    def _include(key: str, value: Any) -> bool:
+        if key == "_output" or key in {"message", "output", "subtest"} and value in (None, "", " "):
+            return False
+
+        # optional fields that are absent from schema version 3
+        return not (key in {"duration_ms", "cpu_ms", "timing", "memory_peak_bytes", "memory_sites"} and value is None)
+
+    @classmethod
+    def _items(cls, obj: Any) -> Iterator[Tuple[str, Any]]:
+        if type(obj) not in _FIELDS:
+            _FIELDS[type(obj)] = tuple(item.name for item in fields(obj) if item.name != "_output")
+        for key in _FIELDS[type(obj)]:
+            value = getattr(obj, key)
+            if cls._include(key, value):
+                yield key, value
+
+    @staticmethod
+    def display_name(test: Test) -> Tuple[str, bool]:
+        """
+        The name of a test as it appears in results.json, and whether it is
+        the parent of a concept exercise's subtests.
+        """
+        name = sub(TRIM_NAME, '\\1 > ', test.name).replace('_', ' ')
+        if "[variation" not in test.name and test.task_id > 0:
+            return name + "~", True
+        return name, False
 
-            if isinstance(value, Status):
-                value = value.name.lower()
+    def _dump_test(self, test: Test, name: str, layout: _Layout, level: int) -> str:
+        return layout.object(
+            ((key, name if key == "name" else value) for key, value in self._items(test)), level
+        )
 
-            result[key] = value
-        return result
+    def dump_test(self, test: Test, indent: Optional[int] = 2) -> str:
+        """
+        Dump a single test as it appears in the tests array of as_json().
+        """
+        return self._dump_test(test, self.display_name(test)[0], _Layout(indent), 0)
 
-    def as_json(self):
+    def write(self, out: TextIO, indent: Optional[int] = 2) -> None:
         """
+        Write the results as JSON in one pass, test by test.
+
         -  Trim off the TestClass name and test_ prefix from each test_name.
         - Replace underscores with spaces for more human-readable strings.
         - Add a sort order signifier (~) to parent tests with subtests.
          (~) ensures parent tests sort to last position.
 
         - If it is a concept exercise, sort the current tests array by
-          task_id and variation# then Dump all results to formatted JSON.
-        """
-
+          task_id and variation#.
 
-        trim_name = compile(r'^(.+)(Test\.test_)')
-        results = asdict(self, dict_factory=self._factory)
+        The output is that of json.dumps with the given indent, or as
+        compact as possible without one.
+        """
+        tests = []
         concept_exercise = False
-
-        for item in results["tests"]:
-
-            if "[variation" not in item["name"] and item["task_id"] > 0:
-                item["name"] = sub(trim_name, '\\1 > ', item["name"]).replace('_', ' ') + "~"
-                concept_exercise = True
-            else:
-                item["name"] = sub(trim_name, '\\1 > ', item["name"]).replace('_', ' ')
+        for test in self.tests:
+            name, parent = self.display_name(test)
+            concept_exercise = concept_exercise or parent
+            tests.append((test.task_id, name, test))
 
         if concept_exercise:
-          results["tests"] = sorted(results["tests"], key= lambda item: (item["task_id"], item["name"]))
+            tests.sort(key=lambda item: (item[0], item[1]))
         else:
-          results["tests"] = sorted(results["tests"], key=lambda item: (item["task_id"]))
+            tests.sort(key=lambda item: item[0])
+
+        layout = _Layout(indent)
+        separator = "{"
+        for key, value in self._items(self):
+            out.write(separator + layout.newline(1) + layout.key(key))
+            separator = ","
+            if key != "tests":
+                out.write(layout.value(value, 1))
+            elif not tests:
+                out.write("[]")
+            else:
+                out.write("[")
+                for number, (_, name, test) in enumerate(tests):
+                    out.write(("," if number else "") + layout.newline(2) + self._dump_test(test, name, layout, 2))
+                out.write(layout.newline(1) + "]")
+        out.write(layout.newline(0) + "}")
 
-        return dumps(results, indent=2)
+    def as_json(self, indent: Optional[int] = 2) -> str:
+        """
+        The results as JSON, see write.
+        """
+        out = StringIO()
+        self.write(out, indent)
+        return out.getvalue()
@@ -0,0 +1,93 @@
+"""
+A live stream of events of a test run, so that its progress can be shown
+(or the run given up on) before results.json is written.
+
+Every event is a JSON object on a line of its own:
+
+    {"event": "collected", "id": NODEID, "name": NAME, "task_id": N}
+        for every collected test, in the order the tests will run
+    {"event": "test", "id": NODEID, "test": {...}}
+        for the test and each of its variations once a test has finished,
+        as they would appear in results.json
+    {"event": "session", "status": STATUS, "message": MESSAGE, "counts": {...}}
+        when the run ends, with the number of tests of every status
+"""
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, TextIO
+
+import pytest
+
+from .data import Results, Status, Test
+
+
+def open_events(target: str) -> TextIO:
+    """
+    Open the target of --events, either fd:N for an open file descriptor
+    or the path of a file or named pipe.
+    """
+    if target.startswith("fd:"):
+        return os.fdopen(int(target[len("fd:") :]), "w", buffering=1, closefd=False)
+    return open(target, "w", buffering=1)  # pylint: disable=consider-using-with
+
+
+class EventStream:
+    """
+    Writes an event line for every collected test, every finished test and
+    the end of the run, from the state kept by ResultsReporter.
+
+    The tests of each test item are tracked in item_tests by their names in
+    tests. Lines are flushed as they are written. Once the reader has gone
+    away, the stream is closed and the run goes on without it.
+    """
+
+    def __init__(self, out: TextIO, results: Results, tests: Dict[str, Test], item_tests: Dict[str, List[str]]) -> None:
+        self.out: Optional[TextIO] = out
+        self.results = results
+        self.tests = tests
+        self.item_tests = item_tests
+
+    def _write(self, line: str) -> None:
+        if self.out is None:
+            return
+        try:
+            self.out.write(line)
+        except OSError:
+            # eg. BrokenPipeError, which must not stop results.json from being written
+            self.close()
+
+    def _event(self, event: str, **fields: Any) -> None:
+        self._write(json.dumps({"event": event, **fields}, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        """
+        Close the stream, if it's still open.
+        """
+        out, self.out = self.out, None
+        if out is not None:
+            try:
+                out.close()
+            except OSError:
+                # flushing what the reader didn't take; the file is closed anyway
+                pass
+
+    def pytest_collection_finish(self, session):
+        for item in session.items:
+            name = ".".join(item.nodeid.split("::")[1:])
+            task = item.get_closest_marker("task")
+            task_id = task.kwargs["taskno"] if task is not None else 0
+            display_name, _ = self.results.display_name(Test(name, task_id=task_id))
+            self._event("collected", id=item.nodeid, name=display_name, task_id=task_id)
+
+    def pytest_runtest_logfinish(self, nodeid, location):
+        for name in self.item_tests.get(nodeid, ()):
+            test = self.results.dump_test(self.tests[name], indent=None)
+            self._write(f'{{"event":"test","id":{json.dumps(nodeid)},"test":{test}}}\n')
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session, exitstatus):
+        # after ResultsReporter has filled in the results
+        counts = Counter(test.status for test in self.results.tests)
+        counts = {status.name.lower(): counts[status] for status in Status}
+        self._event("session", status=self.results.status.name.lower(), message=self.results.message, counts=counts)
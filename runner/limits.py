@@ -0,0 +1,130 @@
+"""
+Resource limits enforced by the test runner itself.
+"""
+import signal
+import time
+from typing import Optional
+
+import pytest
+
+from .data import Options
+
+# how often to keep interrupting a test that ignored its first timeout
+REPEAT_INTERVAL = 0.01
+
+
+class TestTimeout(BaseException):
+    """
+    Raised inside a test that ran out of time.
+
+    Derives from BaseException so `except Exception` in student code can't
+    swallow it.
+    """
+
+    __test__ = False
+
+
+class TimeLimits:
+    """
+    Interrupts tests that exceed the per-test or whole-run time limit.
+
+    Timed-out tests are reported with a `runner_error` message on their
+    report, which ResultsReporter turns into an error. Once the run limit is used up
+    every remaining test times out straight away, so the run still finishes
+    and reports everything that completed.
+
+    The run limit also covers collecting the tests, ie importing the
+    solution. Running out of time there puts the message on the collection
+    report instead, and ResultsReporter turns it into an error of the run.
+    """
+
+    def __init__(self, options: Options) -> None:
+        self.timeout = options.timeout
+        self.run_timeout = options.run_timeout
+        if options.wall_clock:
+            self.clock, self.timer, self.signum = time.monotonic, signal.ITIMER_REAL, signal.SIGALRM
+            self.unit = "seconds"
+        else:
+            self.clock, self.timer, self.signum = time.process_time, signal.ITIMER_PROF, signal.SIGPROF
+            self.unit = "seconds of CPU time"
+        self.deadline: Optional[float] = None
+        self.message: Optional[str] = None
+        self.collecting = False
+
+    def pytest_sessionstart(self, session):
+        if self.run_timeout is not None:
+            self.deadline = self.clock() + self.run_timeout
+
+    def remaining(self) -> Optional[float]:
+        """
+        What is left of the run limit, if there is one.
+        """
+        return None if self.deadline is None else self.deadline - self.clock()
+
+    def restart(self, remaining: Optional[float]) -> None:
+        """
+        Set the run limit to what was left of it in the parent of this forked
+        process, whose CPU time starts over from 0 (see runner.parallel).
+        """
+        if remaining is not None:
+            self.deadline = self.clock() + remaining
+
+    def _expire(self, signum, frame):
+        signal.setitimer(self.timer, REPEAT_INTERVAL)
+        raise TestTimeout(self.message)
+
+    def _limited(self, limit: float):
+        """
+        Run the rest of a hook wrapper with the timer set to limit.
+        """
+        previous = signal.signal(self.signum, self._expire)
+        signal.setitimer(self.timer, limit)
+        try:
+            return (yield)
+        finally:
+            signal.setitimer(self.timer, 0)
+            signal.signal(self.signum, previous)
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_make_collect_report(self, collector):
+        # collectors may collect each other; only the outermost sets the timer
+        if self.deadline is None or self.collecting:
+            return (yield)
+        self.message = f"Loading the tests exceeded the time limit of {self.run_timeout:g} {self.unit}."
+        self.collecting = True
+        try:
+            # errors raised here rather than in the collector would crash pytest,
+            # so a run limit already used up still expires in the collector
+            return (yield from self._limited(max(self.deadline - self.clock(), REPEAT_INTERVAL)))
+        finally:
+            self.collecting = False
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_exception_interact(self, node, call, report):
+        if isinstance(node, pytest.Collector) and call.excinfo.errisinstance(TestTimeout):
+            report.runner_error = str(call.excinfo.value)
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        limit = self.timeout
+        if limit is not None:
+            self.message = f"Test exceeded the time limit of {limit:g} {self.unit}."
+
+        if self.deadline is not None:
+            remaining = self.deadline - self.clock()
+            if limit is None or remaining < limit:
+                limit = remaining
+                self.message = f"Test run exceeded the time limit of {self.run_timeout:g} {self.unit}."
+            if limit <= 0:
+                raise TestTimeout(self.message)
+
+        if limit is None:
+            return (yield)
+        return (yield from self._limited(limit))
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        if call.excinfo is not None and call.excinfo.errisinstance(TestTimeout):
+            report.runner_error = str(call.excinfo.value)
+        return report
@@ -0,0 +1,170 @@
+"""
+Memory limit enforced by the test runner itself, and memory measurements
+of the student's code.
+"""
+import resource
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+
+import pytest
+
+if TYPE_CHECKING:
+    import tracemalloc
+
+MEGABYTE = 1024 * 1024
+
+# number of allocation sites reported per test
+TOP_SITES = 5
+
+# how much more memory must be in use before the sites are looked at again
+SNAPSHOT_GROWTH = 1.25
+
+
+def peak_megabytes() -> int:
+    """
+    Peak resident memory of this process so far, in megabytes.
+    """
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+@contextmanager
+def limit_memory(megabytes: Optional[int]) -> Iterator[None]:
+    """
+    Cap the address space of this process, and of the processes it forks,
+    for the duration of the block.
+    """
+    if megabytes is None:
+        yield
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = megabytes * MEGABYTE
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+class MemoryLimit:
+    """
+    Reports running out of memory under limit_memory.
+
+    A test that raises MemoryError gets a `runner_error` message on its
+    report, which ResultsReporter turns into an error of the test. Running
+    out of memory while collecting, ie importing the solution, puts the
+    message on the collection report instead, and ResultsReporter turns
+    it into an error of the run.
+    """
+
+    def __init__(self, megabytes: int) -> None:
+        self.megabytes = megabytes
+
+    def _message(self, what: str) -> str:
+        return f"{what} exceeded the memory limit of {self.megabytes} MB (peak memory use {peak_megabytes()} MB)."
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        if call.excinfo is not None and call.excinfo.errisinstance(MemoryError):
+            report.runner_error = self._message("Test")
+        return report
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_exception_interact(self, node, call, report):
+        if isinstance(node, pytest.Collector) and call.excinfo.errisinstance(MemoryError):
+            report.runner_error = self._message("Loading the tests")
+
+
+class MemoryTracer:
+    """
+    Traces the memory allocated during every test's call phase.
+
+    The call report gets a `memory_peak_bytes`, the peak of memory
+    allocated during the call and traced by tracemalloc, and
+    `memory_sites`, the lines of the solution holding the most memory.
+    Objects made by the solution are often dropped by the test right after
+    the call that made them, so the sites are taken whenever a solution
+    function returns with noticeably more memory in use than before.
+    """
+
+    def __init__(self, solution_files: Iterable[Path]) -> None:
+        # imported only when tracing, so runs without it don't pay for it
+        import tracemalloc  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        self.tracemalloc = tracemalloc
+        self.solution_files = {str(path.resolve()) for path in solution_files}
+        self.started = False
+        self.seen: Dict[str, bool] = {}
+        self.largest = 0
+        self.snapshot: Optional["tracemalloc.Snapshot"] = None
+        self.peak: Optional[int] = None
+        self.calling = False
+
+    def pytest_configure(self, config):
+        if not self.tracemalloc.is_tracing():
+            self.tracemalloc.start()
+            self.started = True
+
+    def pytest_unconfigure(self, config):
+        if self.started:
+            self.tracemalloc.stop()
+
+    def _is_solution(self, filename: str) -> bool:
+        if filename not in self.seen:
+            self.seen[filename] = str(Path(filename).resolve()) in self.solution_files
+        return self.seen[filename]
+
+    def _on_event(self, frame, event, arg):
+        if event == "return" and self._is_solution(frame.f_code.co_filename):
+            current = self.tracemalloc.get_traced_memory()[0]
+            if current > self.largest * SNAPSHOT_GROWTH:
+                self.largest = current
+                self.snapshot = self.tracemalloc.take_snapshot()
+
+    def _sites(self) -> List[Dict[str, Any]]:
+        if self.snapshot is None:
+            return []
+        statistics = [
+            statistic
+            for statistic in self.snapshot.statistics("lineno")
+            if self._is_solution(statistic.traceback[0].filename)
+        ]
+        return [
+            {
+                "location": f"{Path(statistic.traceback[0].filename).name}:{statistic.traceback[0].lineno}",
+                "size_bytes": statistic.size,
+                "count": statistic.count,
+            }
+            for statistic in statistics[:TOP_SITES]
+        ]
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        # only memory allocated from here on is traced
+        self.tracemalloc.clear_traces()
+        self.largest, self.snapshot = 0, None
+        previous = sys.getprofile()
+        sys.setprofile(self._on_event)
+        self.calling = True
+        try:
+            return (yield)
+        finally:
+            sys.setprofile(previous)
+            self.calling = False
+            self.peak = self.tracemalloc.get_traced_memory()[1]
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        # subtests are reported while the call is still being traced
+        if call.when == "call" and not self.calling and self.peak is not None:
+            report.memory_peak_bytes = self.peak
+            report.memory_sites = self._sites()
+            self.peak, self.snapshot = None, None
+        return report
@@ -0,0 +1,94 @@
+"""
+Writing results.json for the Python test runner.
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import pytest
+
+from .data import Results, Test
+
+INTERRUPTED = "The test run did not finish. Only the tests that completed are listed."
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Replace the contents of path in one step, so readers never see a
+    partially written file.
+    """
+    temp = path.with_name(f".{path.name}.tmp")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+
+
+def write_results(path: Path, results: Results, indent: Optional[int] = 2) -> None:
+    """
+    Replace path with the results in one step, writing them out as they
+    are serialized rather than building the whole text first.
+    """
+    temp = path.with_name(f".{path.name}.tmp")
+    with temp.open("w") as out:
+        results.write(out, indent)
+    os.replace(temp, path)
+
+
+class IncrementalResults:
+    """
+    Keeps results.json up to date after every test report, so a run that
+    dies half way still leaves the results of the tests that finished.
+
+    Every test is kept as its own serialized piece of the tests array, and
+    a report only serializes the tests it touched, which are the last one
+    or two. The pieces are kept joined in a buffer that a report only
+    rewrites from the first piece it touched on, and every flush replaces
+    the file with a temporary one, so readers and a run that dies only
+    ever see a complete file. The file is marked as an errored run until
+    the final results.json replaces it.
+    """
+
+    def __init__(self, out_file: Path, tests: Dict[str, Test], updated: Set[str]) -> None:
+        self.out_file = out_file
+        self.tests = tests
+        self.updated = updated
+
+        # names of the tests in the order they are written, the index of
+        # each name, each test's piece of the array and where it starts in
+        # the joined pieces
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.pieces: List[bytes] = []
+        self.offsets: List[int] = []
+        self.body = bytearray()
+
+        results = Results()
+        results.error(INTERRUPTED)
+        self.dump_test = results.dump_test
+        self.header = results.as_json()[: -len("[]\n}")].encode()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_runtest_logreport(self, report):
+        """
+        Flush the tests updated by this report, after ResultsReporter has run.
+        """
+        if not self.updated:
+            return
+
+        first = len(self.names)
+        for name in self.updated:
+            if name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+                self.pieces.append(b"")
+                self.offsets.append(len(self.body))
+            position = self.index[name]
+            prefix = "[\n    " if position == 0 else ",\n    "
+            self.pieces[position] = (prefix + self.dump_test(self.tests[name]).replace("\n", "\n    ")).encode()
+            first = min(first, position)
+        self.updated.clear()
+
+        del self.body[self.offsets[first] :]
+        for position in range(first, len(self.names)):
+            self.offsets[position] = len(self.body)
+            self.body += self.pieces[position]
+        write_atomic(self.out_file, self.header + self.body + b"\n  ]\n}")
@@ -0,0 +1,163 @@
+"""
+Running the tests of a single submission in several processes.
+"""
+import json
+import os
+import selectors
+import sys
+import traceback
+from typing import Any, Dict, List, Optional, Sequence
+
+import pytest
+from _pytest.reports import TestReport
+
+from .limits import TimeLimits
+
+CRASHED = "The test process exited unexpectedly with status {status} while running this test."
+NOT_RUN = "Test was not run: the test process exited unexpectedly with status {status} before reaching it."
+
+
+class ParallelRunner:
+    """
+    Replaces pytest's test loop with one that forks a worker per job once
+    the tests are collected and sorted.
+
+    Workers take every jobs-th test and run the normal test protocol for
+    each, sending the serialized reports back over a pipe. The reports are
+    replayed here strictly in collection order, so ResultsReporter and
+    every other plugin sees exactly the sequence of a serial run.
+
+    Plugins in parent_only only ever see the replayed reports. Every worker
+    gets what is left of the run limit of limits, if any, when it is forked.
+    """
+
+    def __init__(self, jobs: int, parent_only: Sequence[Any] = (), limits: Optional[TimeLimits] = None) -> None:
+        self.jobs = jobs
+        self.parent_only = list(parent_only)
+        self.limits = limits
+        self.config = None
+        self.worker = False
+        self.reports: List[Dict[str, Any]] = []
+
+    def pytest_configure(self, config):
+        self.config = config
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        items = session.items
+        config = session.config
+        if self.jobs < 2 or len(items) < 2 or session.testsfailed or config.option.collectonly:
+            # collection errors and the like are left to pytest's own loop
+            return None
+
+        jobs = min(self.jobs, len(items))
+        workers = {}
+        selector = selectors.DefaultSelector()
+        remaining = self.limits.remaining() if self.limits is not None else None
+        for worker in range(jobs):
+            indexes = list(range(worker, len(items), jobs))
+            read_fd, write_fd = os.pipe()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                if self.limits is not None:
+                    self.limits.restart(remaining)
+                self._work(session, indexes, write_fd)
+            os.close(write_fd)
+            workers[read_fd] = pid
+            selector.register(read_fd, selectors.EVENT_READ)
+
+        pending: Dict[int, List[Dict[str, Any]]] = {}
+        buffers = {read_fd: b"" for read_fd in workers}
+        replayed = 0
+        while selector.get_map():
+            for key, _ in selector.select():
+                chunk = os.read(key.fd, 1 << 16)
+                if not chunk:
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+                    continue
+                *lines, buffers[key.fd] = (buffers[key.fd] + chunk).split(b"\n")
+                for line in lines:
+                    message = json.loads(line)
+                    pending[message["index"]] = message["reports"]
+            while replayed in pending:
+                self._replay(items[replayed], pending.pop(replayed))
+                replayed += 1
+
+        statuses = [os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in workers.values()]
+        crashed = set()
+        for index in range(replayed, len(items)):
+            if index in pending:
+                self._replay(items[index], pending.pop(index))
+                continue
+            worker = index % jobs
+            message = (NOT_RUN if worker in crashed else CRASHED).format(status=statuses[worker])
+            crashed.add(worker)
+            self._replay_error(items[index], message)
+        return True
+
+    def _work(self, session, indexes: List[int], write_fd: int) -> None:
+        """
+        Run the given tests in this forked child, then exit.
+        """
+        code = 0
+        try:
+            config = session.config
+            for plugin in self.parent_only:
+                if config.pluginmanager.is_registered(plugin):
+                    config.pluginmanager.unregister(plugin)
+
+            # the global capture files are shared with the parent and the
+            # other workers, so capture into fresh ones
+            capman = config.pluginmanager.get_plugin("capturemanager")
+            if capman is not None:
+                capman.stop_global_capturing()
+
+            # the terminal reporter stays, since the subtest progress it
+            # writes while a test's output is captured ends up in that
+            # output, but anything it writes outside of tests is dropped
+            with open(os.devnull, "w") as devnull:
+                os.dup2(devnull.fileno(), sys.stdout.fileno())
+
+            if capman is not None:
+                capman.start_global_capturing()
+                capman.suspend_global_capture()
+
+            self.worker = True
+            with os.fdopen(write_fd, "w") as pipe:
+                for position, index in enumerate(indexes):
+                    item = session.items[index]
+                    nextitem = session.items[indexes[position + 1]] if position + 1 < len(indexes) else None
+                    item.config.hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+                    pipe.write(json.dumps({"index": index, "reports": self.reports}) + "\n")
+                    pipe.flush()
+                    self.reports = []
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def pytest_runtest_logreport(self, report):
+        if self.worker:
+            self.reports.append(self.config.hook.pytest_report_to_serializable(config=self.config, report=report))
+
+    def _replay(self, item, reports: List[Dict[str, Any]]) -> None:
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        for data in reports:
+            report = self.config.hook.pytest_report_from_serializable(config=self.config, data=data)
+            item.ihook.pytest_runtest_logreport(report=report)
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+
+    @staticmethod
+    def _replay_error(item, message: str) -> None:
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        keywords = {name: 1 for name in item.keywords}
+        report = TestReport(item.nodeid, item.location, keywords, "failed", None, "call", runner_error=message)
+        item.ihook.pytest_runtest_logreport(report=report)
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
@@ -0,0 +1,104 @@
+"""
+Profiling the student's code, test by test.
+"""
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+
+import pytest
+
+if TYPE_CHECKING:
+    import pstats
+
+# what a test's profile is written as beside results.json
+PROFILE_FILE = "profile.txt"
+PROFILE_DIR = "profile"
+
+HEADER = f"{'ncalls':>10} {'tottime ms':>12} {'cumtime ms':>12}  function"
+
+
+def solution_table(stats: "pstats.Stats", solution_files: Set[str], top: int) -> List[str]:
+    """
+    The top functions of a profile by their own time, ignoring every
+    function that isn't defined in one of the solution files.
+    """
+    rows = [
+        (total, cumulative, calls, f"{Path(filename).name}:{lineno}({function})")
+        for (filename, lineno, function), (_, calls, total, cumulative, _) in stats.stats.items()
+        if filename in solution_files
+    ]
+    if not rows:
+        return ["  no calls into the solution"]
+
+    rows.sort(key=lambda row: (-row[0], -row[1], row[3]))
+    lines = [HEADER]
+    for total, cumulative, calls, function in rows[:top]:
+        lines.append(f"{calls:>10} {total * 1000:>12.3f} {cumulative * 1000:>12.3f}  {function}")
+    return lines
+
+
+class Profiler:
+    """
+    Runs the call phase of every test under cProfile and writes the
+    hottest functions of the solution for each test to profile.txt in the
+    output directory, optionally with the raw profile of each test.
+
+    The table travels on the test's call report as `profile`, so that it
+    survives running the tests in worker processes.
+    """
+
+    def __init__(self, outdir: Path, solution_files: Iterable[Path], top: int = 10, raw: bool = False) -> None:
+        self.outdir = outdir
+        self.solution_files = {str(path.resolve()) for path in solution_files}
+        self.top = top
+        self.raw = raw
+        self.table: Optional[List[str]] = None
+        self.tables: Dict[str, List[str]] = {}
+
+        # whether each file name seen in a profile is a solution file
+        self.seen: Dict[str, bool] = {}
+
+    def _solution_files(self, stats: "pstats.Stats") -> Set[str]:
+        # code objects carry the path their module was imported by
+        for filename, _, _ in stats.stats:
+            if filename not in self.seen:
+                self.seen[filename] = str(Path(filename).resolve()) in self.solution_files
+        return {filename for filename, _, _ in stats.stats if self.seen[filename]}
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        # imported only when profiling, so runs without it don't pay for it
+        import cProfile  # pylint: disable=import-outside-toplevel
+        import pstats  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return (yield)
+        finally:
+            profile.disable()
+            stats = pstats.Stats(profile)
+            self.table = solution_table(stats, self._solution_files(stats), self.top)
+            if self.raw:
+                raw_dir = self.outdir.joinpath(PROFILE_DIR)
+                raw_dir.mkdir(exist_ok=True)
+                stats.dump_stats(raw_dir.joinpath(re.sub(r"[^\w.-]+", ".", item.nodeid) + ".pstats"))
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        # subtests are reported while the profile is still running
+        if call.when == "call" and self.table is not None:
+            report.profile = self.table
+            self.table = None
+        return report
+
+    def pytest_runtest_logreport(self, report):
+        if getattr(report, "profile", None) is not None:
+            self.tables[report.nodeid] = report.profile
+
+    def pytest_sessionfinish(self, session):
+        lines = []
+        for nodeid, table in self.tables.items():
+            lines += [nodeid.split("::", 1)[-1], *table, ""]
+        self.outdir.joinpath(PROFILE_FILE).write_text("\n".join(lines))
@@ -0,0 +1,210 @@
+"""
+Warm worker daemon for the Python test runner.
+
+Keeps pytest and the runner imported in a long-lived process and serves
+runner.run() requests over a Unix socket, one JSON line per request.
+Requests either run in the daemon itself or, in fork mode, in a freshly
+forked child that inherits the warm imports copy-on-write.
+"""
+import gc
+import importlib
+import json
+import os
+import socketserver
+import sys
+import traceback
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from . import run
+from .cli import build_parser, get_options
+from .data import Directory, Options, Slug
+from .sort import TestOrder
+
+# standard library modules that exercises and their tests commonly import
+COMMON_MODULES = (
+    "collections",
+    "dataclasses",
+    "datetime",
+    "decimal",
+    "fractions",
+    "functools",
+    "itertools",
+    "math",
+    "random",
+    "re",
+    "string",
+    "typing",
+    "unittest",
+    "unittest.mock",
+)
+
+
+class Job(NamedTuple):
+    """
+    A validated run request.
+    """
+
+    slug: Slug
+    indir: Directory
+    outdir: Directory
+    args: List[str]
+    options: Options
+
+
+def preload() -> None:
+    """
+    Import pytest's built-in plugins, any installed entry-point plugins and
+    the commonly used standard library so that requests don't pay for them.
+    """
+    import _pytest.config
+
+    for name in _pytest.config.default_plugins:
+        importlib.import_module(f"_pytest.{name}")
+
+    for entry_point in entry_points(group="pytest11"):
+        entry_point.load()
+
+    for name in COMMON_MODULES:
+        importlib.import_module(name)
+
+
+def _forget_modules(indir: Path) -> None:
+    """
+    Drop every module imported from the solution directory so the next
+    request imports its own copies.
+    """
+    root = indir.resolve()
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename and root in Path(filename).resolve().parents:
+            del sys.modules[name]
+
+
+def parse_request(request: Dict[str, Any]) -> Job:
+    """
+    Validate the command line of a request, resolving its directories
+    against the current directory.
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(request["argv"])
+    except SystemExit as err:
+        raise ValueError(f"invalid arguments: {request['argv']!r}") from err
+
+    if args.output is None:
+        raise ValueError("the following arguments are required: SLUG, IN, OUT")
+    return Job(args.slug, args.input, args.output, args.pytest_args, get_options(args))
+
+
+def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the tests described by a single request in this process.
+    """
+    path = list(sys.path)
+    previous = os.getcwd()
+    os.chdir(request.get("cwd") or previous)
+    try:
+        job = parse_request(request)
+        try:
+            run(*job)
+        finally:
+            _forget_modules(job.indir)
+            sys.path[:] = path
+            TestOrder._cache.clear()
+    finally:
+        os.chdir(previous)
+    return {"ok": True}
+
+
+def fork_job(job: Job, log: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Run a job in a forked child and reap it, reporting its exit status and
+    resource usage. The child writes its output to log, if given.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            if log is not None:
+                with log.open("wb") as out:
+                    os.dup2(out.fileno(), sys.stdout.fileno())
+                    os.dup2(out.fileno(), sys.stderr.fileno())
+            run(*job)
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    _, status, usage = os.wait4(pid, 0)
+    exit_status = os.waitstatus_to_exitcode(status)
+    return {
+        "ok": exit_status == 0,
+        "exit_status": exit_status,
+        "rusage": {
+            "utime": usage.ru_utime,
+            "stime": usage.ru_stime,
+            "maxrss": usage.ru_maxrss,
+        },
+    }
+
+
+def fork_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the tests described by a single request in a forked child.
+    """
+    previous = os.getcwd()
+    os.chdir(request.get("cwd") or previous)
+    try:
+        response = fork_job(parse_request(request))
+    finally:
+        os.chdir(previous)
+
+    if not response["ok"]:
+        response["message"] = f"runner exited with status {response['exit_status']}"
+    print(f"{' '.join(request['argv'])}: {json.dumps(response)}", file=sys.stderr)
+    return response
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Reads one JSON request per connection and writes back one JSON response.
+    """
+
+    def handle(self) -> None:
+        handler = fork_request if self.server.fork else handle_request
+        try:
+            response = handler(json.loads(self.rfile.readline()))
+        except Exception as err:  # pylint: disable=broad-except
+            response = {"ok": False, "message": str(err)}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def serve(socket_path: Path, fork: bool = False) -> None:
+    """
+    Serve run requests on the given Unix socket until interrupted.
+    """
+    preload()
+
+    if fork:
+        # keep the warm heap out of the collector so children don't dirty
+        # the pages they share with us
+        gc.freeze()
+
+    if socket_path.is_socket():
+        socket_path.unlink()
+
+    with socketserver.UnixStreamServer(str(socket_path), RequestHandler) as server:
+        server.fork = fork
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
@@ -2,7 +2,7 @@
 Test Runner for Python.
 """
 from ast import (
-    NodeVisitor,
+    AST,
     ClassDef,
     FunctionDef,
     AsyncFunctionDef,
@@ -13,23 +13,54 @@ from ast import (
     If
 )
 from pathlib import Path
-from typing import Dict, overload
+from typing import Dict, Iterable, List, Optional, Union
 
 from .data import Hierarchy, TestInfo
+from .testindex import TestIndex, content_key
 
 # pylint: disable=invalid-name, no-self-use
 
+# fields of compound statements (and their except / case clauses) holding
+# nested statements, in the order they appear in the source
+BODIES = ("body", "handlers", "orelse", "finalbody", "cases")
 
-class TestOrder(NodeVisitor):
+
+class TestOrder:
     """
-    Visits test_* methods in a file and caches their definition order.
+    Indexes the test_* methods in a file and caches their definition order.
+
+    A file is indexed in a single pass over its statements, never descending
+    into expressions, and each test's dedented source is produced once as it
+    is found.
     """
 
     _cache: Dict[Hierarchy, TestInfo] = {}
 
-    def __init__(self, root: Hierarchy) -> None:
-        super().__init__()
-        self._hierarchy = [root]
+    # tests of each parsed file keyed by the file's contents, so identical
+    # test files in different solution directories are only parsed once
+    _sources: Dict[str, Dict[Hierarchy, TestInfo]] = {}
+
+    # pre-built tests of a whole track, see runner.testindex
+    _index: Optional[TestIndex] = None
+
+    def __init__(self, text: str = "") -> None:
+        self._hierarchy = []
+        self._lines = text.splitlines()
+        self.tests: Dict[Hierarchy, TestInfo] = {}
+
+    def visit(self, statements: Iterable[AST]) -> None:
+        """
+        Indexes the tests among the given statements and the statements
+        nested in them.
+        """
+        for node in statements:
+            if isinstance(node, ClassDef):
+                self.visit_ClassDef(node)
+            elif isinstance(node, (FunctionDef, AsyncFunctionDef)):
+                self.visit_FunctionDef(node)
+            else:
+                for field in BODIES:
+                    self.visit(getattr(node, field, ()))
 
     def visit_ClassDef(self, node: ClassDef) -> None:
         """
@@ -37,21 +68,18 @@ class TestOrder(NodeVisitor):
         """
         bases = {f"{base.value.id}.{base.attr}" for base in node.bases}
 
-        if "unittest.TestCase" in bases:
-            self._hierarchy.append(Hierarchy(node.name))
+        if "unittest.TestCase" not in bases:
+            self.visit(node.body)
+            return
 
-        self.generic_visit(node)
+        self._hierarchy.append(Hierarchy(node.name))
+        self.visit(node.body)
         self._hierarchy.pop()
 
-    @overload
-    def _visit_definition(self, node: FunctionDef) -> None:
-        ...
-
-    @overload
-    def _visit_definition(self, node: AsyncFunctionDef) -> None:
-        ...
-
-    def _visit_definition(self, node):
+    def visit_FunctionDef(self, node: Union[FunctionDef, AsyncFunctionDef]) -> None:
+        """
+        Handles test definitions, async or not.
+        """
         if node.name.startswith("test_"):
             last_body = node.body[-1]
 
@@ -59,29 +87,71 @@ class TestOrder(NodeVisitor):
             while isinstance(last_body, (For, While, If, With)):
                 last_body = last_body.body[-1]
 
-            testinfo = TestInfo(node.lineno, last_body.lineno, 1)
-            self._cache[self.get_hierarchy(Hierarchy(node.name))] = testinfo
+            source = self.dedent(self._lines[node.lineno : last_body.lineno + 1])
+            testinfo = TestInfo(node.lineno, last_body.lineno, 1, source)
+            self.tests[self.get_hierarchy(Hierarchy(node.name))] = testinfo
 
-        self.generic_visit(node)
+        self.visit(node.body)
 
-    def visit_FunctionDef(self, node: FunctionDef) -> None:
+    def get_hierarchy(self, name: Hierarchy) -> Hierarchy:
         """
-        Handles test definitions
+        Returns the hierarchy :: joined.
         """
-        self._visit_definition(node)
+        return Hierarchy("::".join(self._hierarchy + [name]))
 
-    def visit_AsyncFunctionDef(self, node: AsyncFunctionDef) -> None:
+    @staticmethod
+    def dedent(lines: List[str]) -> str:
         """
-        Handles async test definitions
+        Joins the lines of a test, without a trailing blank line and with
+        their common leading spaces removed.
         """
-        self._visit_definition(node)
+        if lines and not lines[-1]:
+            lines = lines[:-1]
 
-    def get_hierarchy(self, name: Hierarchy) -> Hierarchy:
+        # only lines with more than spaces on them count towards the indent
+        indent = min((len(line) - len(line.lstrip(' ')) for line in lines if line.strip(' ')), default=0)
+        return '\n'.join(line[indent:] for line in lines)
+
+    @classmethod
+    def use_index(cls, path: Path) -> None:
         """
-        Returns the hierarchy :: joined.
+        Looks up test files in the index at the given path before parsing them.
         """
-        return Hierarchy("::".join(self._hierarchy + [name]))
+        if cls._index is None or cls._index.path != path:
+            cls._index = TestIndex.open(path)
 
+    @classmethod
+    def parse(cls, text: str, filename: str) -> Dict[Hierarchy, TestInfo]:
+        """
+        Returns the tests defined in the given source keyed by their
+        hierarchy within it, ie Class::test_function.
+
+        The result is stored in the indexes of bin/build_cache.py, so
+        changing it must bump runner.testindex.INDEXER_VERSION.
+        """
+        visitor = cls(text)
+        visitor.visit(parse(text, filename).body)
+        return visitor.tests
+
+    @classmethod
+    def index(cls, source: Path) -> Dict[Hierarchy, TestInfo]:
+        """
+        Returns the tests defined in the given file keyed by their hierarchy
+        within it, ie Class::test_function.
+        """
+        text = source.read_text()
+        if text not in cls._sources:
+            tests = cls._index.get(content_key(text)) if cls._index else None
+            if tests is None:
+                tests = cls.parse(text, source.name)
+            cls._sources[text] = tests
+        return cls._sources[text]
+
+    @classmethod
+    def _load(cls, test_id: Hierarchy, source: Path) -> None:
+        root = test_id.split("::")[0]
+        for name, testinfo in cls.index(source).items():
+            cls._cache[Hierarchy(f"{root}::{name}")] = testinfo
 
     @classmethod
     def lineno(cls, test_id: Hierarchy, source: Path) -> int:
@@ -89,8 +159,7 @@ class TestOrder(NodeVisitor):
         Returns the line that the given test was defined on.
         """
         if test_id not in cls._cache:
-            tree = parse(source.read_text(), source.name)
-            cls(Hierarchy(test_id.split("::")[0])).visit(tree)
+            cls._load(test_id, source)
         return cls._cache[test_id].lineno
 
 
@@ -102,19 +171,6 @@ class TestOrder(NodeVisitor):
         :param source: Path of source code file
         :return: str of the source code of the given test.
         """
-        text = source.read_text()
-        testinfo = cls._cache[test_id]
-
-        lines = text.splitlines()[testinfo.lineno: testinfo.end_lineno + 1]
-
         if test_id not in cls._cache:
-            tree = parse(text, source.name)
-            cls(Hierarchy(test_id.split("::")[0])).visit(tree)
-
-        if not lines[-1]:
-            lines.pop()
-
-        # Dedents source.
-        while all(line.startswith(' ') for line in lines if line):
-            lines = [line[1:] if line else line for line in lines]
-        return '\n'.join(lines)
+            cls._load(test_id, source)
+        return cls._cache[test_id].source
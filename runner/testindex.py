@@ -0,0 +1,112 @@
+"""
+Persistent index of the tests defined in a track's test files.
+
+TestOrder's view of a test file (each test's line numbers and dedented
+source) depends only on the file's contents, so it can be computed once for
+a whole track by bin/build_cache.py and shared by every run. The index is a
+single file that runs memory-map read-only:
+
+    magic | header length | marshal({content hash: (offset, length)}) | entries...
+
+where each entry is the marshalled tests of one test file.
+"""
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .data import Hierarchy, TestInfo
+
+# file name of the index inside the cache directory
+INDEX_FILE = "testinfo.idx"
+
+# version of TestOrder.parse's output, part of the magic so that an index
+# built by an older runner is ignored rather than read; bump it whenever
+# that output changes
+INDEXER_VERSION = 2
+
+MAGIC = b"PYTRIDX" + str(INDEXER_VERSION).encode()
+PREAMBLE = struct.Struct(f"<{len(MAGIC)}sI")
+
+
+def content_key(text: str) -> str:
+    """
+    Key of a test file in the index.
+    """
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def write_index(path: Path, files: Dict[str, Dict[Hierarchy, TestInfo]]) -> None:
+    """
+    Write the tests of each test file, keyed by content_key, to an index
+    at path, replacing any previous index in one step.
+    """
+    header: Dict[str, Tuple[int, int]] = {}
+    entries = []
+    offset = 0
+    for key, tests in files.items():
+        entry = marshal.dumps(
+            tuple((name, info.lineno, info.end_lineno, info.variants, info.source) for name, info in tests.items())
+        )
+        header[key] = (offset, len(entry))
+        entries.append(entry)
+        offset += len(entry)
+
+    header_bytes = marshal.dumps(header)
+    temp = path.with_name(f".{path.name}.{os.getpid()}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with temp.open("wb") as index:
+        index.write(PREAMBLE.pack(MAGIC, len(header_bytes)))
+        index.write(header_bytes)
+        index.writelines(entries)
+    os.replace(temp, path)
+
+
+class TestIndex:
+    """
+    A read-only, memory-mapped index written by write_index.
+
+    Only the header is unmarshalled up front; the tests of a file are read
+    from the mapping when they are first asked for.
+    """
+
+    __test__ = False
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as index:
+            self._map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = PREAMBLE.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a test index of this version of the runner")
+        self._start = PREAMBLE.size + header_length
+        self._header: Dict[str, Tuple[int, int]] = marshal.loads(self._map[PREAMBLE.size : self._start])
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["TestIndex"]:
+        """
+        Open the index at path, or return None if there is no usable one.
+        """
+        try:
+            return cls(path)
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            return None
+
+    def __len__(self) -> int:
+        return len(self._header)
+
+    def get(self, key: str) -> Optional[Dict[Hierarchy, TestInfo]]:
+        """
+        The tests of the test file with the given content_key, if indexed.
+        """
+        if key not in self._header:
+            return None
+        offset, length = self._header[key]
+        start = self._start + offset
+        return {
+            Hierarchy(name): TestInfo(lineno, end_lineno, variants, source)
+            for name, lineno, end_lineno, variants, source in marshal.loads(self._map[start : start + length])
+        }
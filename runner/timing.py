@@ -0,0 +1,118 @@
+"""
+Timings of a test run: the phases of the run, recorded when bin/run.sh is
+started with RUNNER_STARTUP_PROFILE set and compared against a budget by
+bin/benchmark.py, and the per-test timings reported with --timings.
+"""
+import json
+from pathlib import Path
+from time import perf_counter, process_time
+from typing import Dict, Optional
+
+import pytest
+
+
+class Phases:
+    """
+    Records how long each consecutive phase of a run takes.
+    """
+
+    def __init__(self, start: Optional[float] = None) -> None:
+        self.last = perf_counter() if start is None else start
+        self.durations: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        """
+        End the current phase, naming it.
+        """
+        now = perf_counter()
+        self.durations[phase] = now - self.last
+        self.last = now
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_configure(self, config):
+        self.mark("pytest config")
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_finish(self, session):
+        self.mark("collection")
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionfinish(self, session, exitstatus):
+        self.mark("execution")
+
+    def write(self, path: Path) -> None:
+        """
+        Dump the phases in milliseconds.
+        """
+        phases = {phase: seconds * 1000 for phase, seconds in self.durations.items()}
+        path.write_text(json.dumps({"phases_ms": phases, "total_ms": sum(phases.values())}, indent=2))
+
+
+class Timings:
+    """
+    Measures the CPU time of every test phase and subtest.
+
+    Reports get a `cpu_ms` next to pytest's own wall-clock `duration`, from
+    which ResultsReporter adds up each test's time. A phase's CPU time
+    includes its subtests, just like its duration does. Subtests of
+    unittest tests come without a duration, so theirs is measured here.
+    """
+
+    def __init__(self) -> None:
+        self.session_start = 0.0
+        self.session_ms = 0.0
+        self.tests_ms = 0.0
+        self.phase_start = 0.0
+        self.last = 0.0
+        self.last_wall = 0.0
+        self.calling = False
+
+    def pytest_sessionstart(self, session):
+        self.session_start = perf_counter()
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        self.session_ms = (perf_counter() - self.session_start) * 1000
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        self.phase_start = self.last = process_time()
+        self.last_wall = perf_counter()
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        self.calling = True
+        try:
+            return (yield)
+        finally:
+            self.calling = False
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        now, now_wall = process_time(), perf_counter()
+        if self.calling:
+            # a subtest, reported while its test is still running
+            report.cpu_ms = (now - self.last) * 1000
+            if not report.duration:
+                report.duration = now_wall - self.last_wall
+        else:
+            report.cpu_ms = (now - self.phase_start) * 1000
+            self.phase_start = now
+        self.last, self.last_wall = now, now_wall
+        return report
+
+    def pytest_runtest_logreport(self, report):
+        if getattr(report, "context", None) is None:
+            self.tests_ms += report.duration * 1000
+
+    def summary(self, phases: Phases) -> Dict[str, float]:
+        """
+        The run-level timings: the wall-clock time of the runner so far, of
+        the pytest session and of the tests, and the runner's overhead.
+        """
+        runner_ms = sum(phases.durations.values()) * 1000
+        return {
+            "runner_ms": round(runner_ms, 3),
+            "session_ms": round(self.session_ms, 3),
+            "tests_ms": round(self.tests_ms, 3),
+            "overhead_ms": round(runner_ms - self.tests_ms, 3),
+        }
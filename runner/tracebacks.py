@@ -0,0 +1,92 @@
+"""
+Pruning tracebacks before pytest renders them.
+
+A student's runaway recursion fails with a traceback of about a thousand
+frames, all from the same few lines. pytest walks and compares every one of
+them to render the failure, though only the exception itself ends up in the
+message of the test. The traceback is pruned to the frames that can matter
+first, and messages are capped in length.
+"""
+import os
+from pathlib import Path
+from types import TracebackType
+from typing import Dict, List, Optional, Tuple
+
+import _pytest
+import pluggy
+from _pytest._code.code import Traceback
+
+# times the same line may appear in a pruned traceback
+REPEATS = 3
+
+# frames kept of a traceback that is still deep once pruned, half from each end
+MAX_FRAMES = 40
+
+# characters kept of a message, half from each end
+MAX_MESSAGE = 5000
+
+# frames hidden by pytest anyway, as in _pytest._code.code.filter_traceback
+INTERNAL = tuple(str(Path(module.__file__).parent) + os.sep for module in (_pytest, pluggy))
+
+
+def _internal(raw: TracebackType) -> bool:
+    filename = raw.tb_frame.f_code.co_filename
+    return filename.startswith(INTERNAL) or "<" in filename and ">" in filename
+
+
+def prune(tb: Optional[TracebackType]) -> Optional[TracebackType]:
+    """
+    Drop the frames of pytest and pluggy from a traceback, and every frame
+    of a line already seen REPEATS times but the last one, then cut it to
+    MAX_FRAMES.
+
+    The result is a new chain of traceback objects, since pytest rebuilds
+    tracebacks from the chain when it cuts them.
+    """
+    frames: List[TracebackType] = []
+    while tb is not None:
+        frames.append(tb)
+        tb = tb.tb_next
+    entries = [raw for raw in frames if not _internal(raw)] or frames
+
+    seen: Dict[Tuple[object, int], int] = {}
+    pruned = []
+    for raw in entries[:-1]:
+        key = (raw.tb_frame.f_code, raw.tb_lineno)
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] <= REPEATS:
+            pruned.append(raw)
+    pruned += entries[-1:]
+
+    if len(pruned) > MAX_FRAMES:
+        pruned = pruned[: MAX_FRAMES // 2] + pruned[-MAX_FRAMES // 2 :]
+    if len(pruned) == len(frames):
+        return frames[0] if frames else None
+
+    tb = None
+    for raw in reversed(pruned):
+        tb = TracebackType(tb, raw.tb_frame, raw.tb_lasti, raw.tb_lineno)
+    return tb
+
+
+def truncate_message(message: str) -> str:
+    """
+    Cut the middle out of a message longer than MAX_MESSAGE.
+    """
+    if len(message) <= MAX_MESSAGE:
+        return message
+    omitted = len(message) - MAX_MESSAGE
+    return f"{message[: MAX_MESSAGE // 2]}\n[... {omitted} characters omitted ...]\n{message[-MAX_MESSAGE // 2 :]}"
+
+
+class PrunedTracebacks:
+    """
+    Prunes the traceback of every failing test and subtest before its
+    report is made.
+    """
+
+    # not tryfirst, so this runs after unittest has put the exception
+    # recorded by the test case on the call
+    def pytest_runtest_makereport(self, item, call):
+        if call.excinfo is not None:
+            call.excinfo.traceback = Traceback(prune(call.excinfo.tb))
@@ -0,0 +1,10 @@
+import os
+import signal
+
+
+def hello():
+    return "Hello, World!"
+
+
+def crash():
+    os.kill(os.getpid(), signal.SIGKILL)
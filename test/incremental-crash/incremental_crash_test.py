@@ -0,0 +1,14 @@
+import unittest
+
+from incremental_crash import crash, hello
+
+
+class IncrementalCrashTest(unittest.TestCase):
+    def test_hello(self):
+        self.assertEqual(hello(), "Hello, World!")
+
+    def test_goodbye(self):
+        self.assertEqual(hello(), "Goodbye, World!")
+
+    def test_crash(self):
+        self.assertIsNone(crash())
@@ -0,0 +1,6 @@
+while True:
+    pass
+
+
+def hello():
+    return "Hello, World!"
@@ -0,0 +1,8 @@
+import unittest
+
+from limits_timeout_import import hello
+
+
+class LimitsTimeoutImportTest(unittest.TestCase):
+    def test_hello(self):
+        self.assertEqual(hello(), "Hello, World!")
@@ -0,0 +1,12 @@
+import time
+
+
+def spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+    return True
+
+
+# most of the run limit goes on loading the solution
+spin(1.0)
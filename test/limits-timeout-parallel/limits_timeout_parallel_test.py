@@ -0,0 +1,11 @@
+import unittest
+
+from limits_timeout_parallel import spin
+
+
+class LimitsTimeoutParallelTest(unittest.TestCase):
+    def test_first(self):
+        self.assertTrue(spin(1.0))
+
+    def test_second(self):
+        self.assertTrue(spin(1.0))
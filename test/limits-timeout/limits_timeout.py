@@ -0,0 +1,16 @@
+def hello():
+    return "Hello, World!"
+
+
+def spin():
+    while True:
+        pass
+
+
+def spin_forgiving():
+    while True:
+        try:
+            while True:
+                pass
+        except Exception:
+            pass
@@ -0,0 +1,17 @@
+import unittest
+
+from limits_timeout import hello, spin, spin_forgiving
+
+
+class LimitsTimeoutTest(unittest.TestCase):
+    def test_before(self):
+        self.assertEqual(hello(), "Hello, World!")
+
+    def test_spin(self):
+        self.assertIsNone(spin())
+
+    def test_spin_forgiving(self):
+        self.assertIsNone(spin_forgiving())
+
+    def test_after(self):
+        self.assertEqual(hello(), "Hello, World!")
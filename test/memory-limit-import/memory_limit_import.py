@@ -0,0 +1,5 @@
+TABLE = bytearray(512 * 1024 * 1024)
+
+
+def hello():
+    return "Hello, World!"
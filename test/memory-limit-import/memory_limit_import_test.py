@@ -0,0 +1,8 @@
+import unittest
+
+from memory_limit_import import hello
+
+
+class MemoryLimitImportTest(unittest.TestCase):
+    def test_hello(self):
+        self.assertEqual(hello(), "Hello, World!")
@@ -0,0 +1,6 @@
+def hello():
+    return "Hello, World!"
+
+
+def hog():
+    return len(bytearray(512 * 1024 * 1024))
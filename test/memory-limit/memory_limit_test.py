@@ -0,0 +1,14 @@
+import unittest
+
+from memory_limit import hello, hog
+
+
+class MemoryLimitTest(unittest.TestCase):
+    def test_before(self):
+        self.assertEqual(hello(), "Hello, World!")
+
+    def test_hog(self):
+        self.assertEqual(hog(), 512 * 1024 * 1024)
+
+    def test_after(self):
+        self.assertEqual(hello(), "Hello, World!")
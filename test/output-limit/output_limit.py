@@ -0,0 +1,4 @@
+def countdown(start):
+    for number in range(start, 0, -1):
+        print(f"{number} bottles of beer on the wall")
+    return start
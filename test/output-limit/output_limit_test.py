@@ -0,0 +1,11 @@
+import unittest
+
+from output_limit import countdown
+
+
+class OutputLimitTest(unittest.TestCase):
+    def test_countdown(self):
+        for variant, start in enumerate((3, 200000, 5, 100000), start=1):
+            with self.subTest(f"variation #{variant}", start=start):
+                print(f"counting down from {start}")
+                self.assertEqual(countdown(start), 0)
@@ -0,0 +1,5 @@
+from staging_helpers_data import GREETING
+
+
+def hello():
+    return GREETING
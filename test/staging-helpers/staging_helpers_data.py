@@ -0,0 +1,9 @@
+import unittest
+
+GREETING = "Hello, World!"
+
+
+class HelperTest(unittest.TestCase):
+    @unittest.skip("helpers are staged with their skips stripped")
+    def test_helper(self):
+        pass
@@ -0,0 +1,9 @@
+import unittest
+
+from staging_helpers import hello
+
+
+class StagingHelpersTest(unittest.TestCase):
+    @unittest.skip("stripped when staged")
+    def test_hello(self):
+        self.assertEqual(hello(), "Hello, World!")
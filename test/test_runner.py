@@ -2,20 +2,52 @@
 Run tests on the test runner itself.
 """
 import json
+import os
+import re
+import shutil
 import subprocess
+import sys
 import tempfile
+import time
 from pathlib import Path
 
 import pytest
 
+from runner import data, sort, testindex
+
 ROOT = Path(__file__).parent
-RUNNER = ROOT.joinpath("..", "bin", "run.sh").resolve(strict=True)
+BIN = ROOT.joinpath("..", "bin").resolve(strict=True)
+RUNNER = BIN.joinpath("run.sh").resolve(strict=True)
+BUILD_CACHE = BIN.joinpath("build_cache.py").resolve(strict=True)
+
+# the track scripts in bin/ import each other as top-level modules
+sys.path.insert(0, str(BIN))
+# pylint: disable=wrong-import-position
+import data as track_data
+import test_exercises
+
+STAGING_EXERCISE = ROOT.joinpath("staging-helpers")
+# listed out of slug order in the track of the track fixture
+TRACK_EXERCISES = ["example-success", "example-partial-fail", "example-all-fail"]
+TRACK_FAILURES = "FAILURES:  example-all-fail (TestFailed), example-partial-fail (TestFailed)"
 
 STYLE_TEST = ROOT.joinpath("traceback-styles/traceback_styles_test.py")
 TESTS = sorted(ROOT.glob("example*/example*_test.py"))
+LIMITS_TEST = ROOT.joinpath("limits-timeout/limits_timeout_test.py")
+LIMITS_IMPORT_TEST = ROOT.joinpath("limits-timeout-import/limits_timeout_import_test.py")
+LIMITS_PARALLEL_TEST = ROOT.joinpath("limits-timeout-parallel/limits_timeout_parallel_test.py")
+CRASH_TEST = ROOT.joinpath("incremental-crash/incremental_crash_test.py")
+MEMORY_TESTS = [
+    ROOT.joinpath("memory-limit/memory_limit_test.py"),
+    ROOT.joinpath("memory-limit-import/memory_limit_import_test.py"),
+]
+OUTPUT_TEST = ROOT.joinpath("output-limit/output_limit_test.py")
+RECURSION_TEST = ROOT.joinpath("traceback-recursion/traceback_recursion_test.py")
+FRAMES_TEST = ROOT.joinpath("traceback-frames/traceback_frames_test.py")
+SYNTAX_ERROR_TEST = ROOT.joinpath("example-syntax-error/example_syntax_error_test.py")
 
 
-def run_in_subprocess(test_path, golden_path, args=None):
+def run_in_subprocess(test_path, golden_path, args=None, env=None, runner_args=None, pass_fds=()):
     """
     Run given tests against the given golden file.
     """
@@ -24,7 +56,9 @@ def run_in_subprocess(test_path, golden_path, args=None):
     args = ["--color=no"] + (args or [])
     with tempfile.TemporaryDirectory(prefix="test-runner-tests", dir=ROOT) as tmp_dir:
         rc = subprocess.run(
-            [RUNNER, exercise_name, exercise_dir, tmp_dir] + args, env={}
+            [RUNNER] + (runner_args or []) + [exercise_name, exercise_dir, tmp_dir] + args,
+            env=env or {},
+            pass_fds=pass_fds,
         ).returncode
         results = Path(tmp_dir).joinpath("results.json").resolve(strict=True)
         return json.loads(results.read_text()), json.loads(golden_path.read_text()), rc
@@ -66,3 +100,527 @@ def test_style_matches_golden_file(test_with_golden, style):
     results, golden, rc = run_in_subprocess(*test_with_golden, args=[f"--tb={style}"])
     assert results == golden, f"results with --tb={style} must not change results.json"
     assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+@pytest.fixture(scope="module", params=[[], ["--fork"]], ids=["in-process", "fork"])
+def daemon(request):
+    """
+    Socket of a warm runner started with `bin/run.py --serve`, with and without --fork.
+    """
+    with tempfile.TemporaryDirectory(prefix="test-runner-daemon") as tmp_dir:
+        socket = Path(tmp_dir).joinpath("runner.sock")
+        proc = subprocess.Popen(
+            [sys.executable, RUNNER.with_name("run.py"), "--serve", socket] + request.param,
+            env={"PYTHONPATH": str(RUNNER.parent.parent)},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        while not socket.is_socket() and proc.poll() is None:
+            time.sleep(0.05)
+        yield socket
+        proc.terminate()
+        proc.wait()
+
+
+def test_daemon_matches_golden_file(test_with_golden, daemon):
+    """
+    Test that runs served by a warm daemon match the golden file.
+    """
+    results, golden, rc = run_in_subprocess(*test_with_golden, env={"RUNNER_SOCKET": str(daemon)})
+    assert results == golden, "results from the daemon must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_batch_matches_golden_files():
+    """
+    Test that a `bin/run.py --batch` run produces every golden file.
+    """
+    with tempfile.TemporaryDirectory(prefix="test-runner-batch", dir=ROOT) as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        manifest = tmp_dir.joinpath("manifest.jsonl")
+        jobs = []
+        for exercise_dir in sorted({test_path.parent for test_path in TESTS}):
+            outdir = tmp_dir.joinpath(exercise_dir.name)
+            outdir.mkdir()
+            jobs.append({
+                "slug": exercise_dir.name,
+                "input": str(exercise_dir),
+                "output": str(outdir),
+                "args": ["--color=no"],
+            })
+        manifest.write_text("".join(json.dumps(job) + "\n" for job in jobs))
+
+        rc = subprocess.run(
+            [sys.executable, RUNNER.with_name("run.py"), "--batch", manifest],
+            env={"PYTHONPATH": str(RUNNER.parent.parent)},
+            stdout=subprocess.DEVNULL,
+        ).returncode
+        assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+        summary = json.loads(tmp_dir.joinpath("manifest.summary.json").read_text())
+        assert summary["jobs"] == len(jobs)
+
+        for job in jobs:
+            results = json.loads(Path(job["output"]).joinpath("results.json").read_text())
+            golden = json.loads(Path(job["input"]).joinpath("results.json").read_text())
+            assert results == golden, f"{job['slug']}: results must match the golden file"
+
+
+def test_batch_ignores_stale_results():
+    """
+    Test that a batch job killed before writing results.json isn't reported with an earlier run's status.
+    """
+    with tempfile.TemporaryDirectory(prefix="test-runner-batch", dir=ROOT) as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        manifest = tmp_dir.joinpath("manifest.jsonl")
+        tmp_dir.joinpath("results.json").write_text(json.dumps({"version": 3, "status": "pass", "tests": []}))
+        job = {"slug": CRASH_TEST.parent.name, "input": str(CRASH_TEST.parent), "output": str(tmp_dir)}
+        manifest.write_text(json.dumps(job) + "\n")
+
+        subprocess.run(
+            [sys.executable, RUNNER.with_name("run.py"), "--batch", manifest],
+            env={"PYTHONPATH": str(RUNNER.parent.parent)},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        summary = json.loads(tmp_dir.joinpath("manifest.summary.json").read_text())
+        assert not summary["results"][0]["ok"], "the job must have been killed"
+        assert summary["results"][0].get("status") != "pass", "a stale results.json must not be reported"
+
+
+def test_parallel_results_match_golden_file(test_with_golden):
+    """
+    Test that spreading the tests over several processes doesn't change the results.
+    """
+    results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--jobs", "3"])
+    assert results == golden, "results of a parallel run must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_compact_results_match_golden_file(test_with_golden):
+    """
+    Test that compact results hold the same data as the golden file.
+    """
+    results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--compact"])
+    assert results == golden, "compact results must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_lean_results_match_golden_file(test_with_golden):
+    """
+    Test that starting pytest lean doesn't change the results.
+    """
+    results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--lean"])
+    assert results == golden, "results of a lean run must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_events_match_results(test_with_golden):
+    """
+    Test that the event stream ends up with the tests and status of results.json.
+    """
+    with tempfile.TemporaryDirectory(prefix="test-runner-events", dir=ROOT) as tmp_dir:
+        events_file = Path(tmp_dir, "events.ndjson")
+        results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--events", str(events_file)])
+        events = [json.loads(line) for line in events_file.read_text().splitlines()]
+
+    assert results == golden, "streaming events must not change the results"
+    kinds = [event["event"] for event in events]
+    assert kinds == sorted(kinds, key=["collected", "test", "session"].index), "events must come in order"
+    assert kinds[-1] == "session" and events[-1]["status"] == results["status"]
+    tests = {event["test"]["name"]: event["test"] for event in events if event["event"] == "test"}
+    assert tests == {test["name"]: test for test in results["tests"]}, "the last event of each test must match"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_events_reader_gone_keeps_results(test_with_golden):
+    """
+    Test that a run whose events reader has gone away still writes results.json.
+    """
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    try:
+        results, golden, rc = run_in_subprocess(
+            *test_with_golden, runner_args=["--events", f"fd:{write_fd}"], pass_fds=(write_fd,)
+        )
+    finally:
+        os.close(write_fd)
+    assert results == golden, "a broken event stream must not change the results"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_timings_match_golden_file(test_with_golden):
+    """
+    Test that --timings only adds the timing fields to the results.
+    """
+    results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--timings"])
+    timing = results.pop("timing")
+    assert set(timing) == {"runner_ms", "session_ms", "tests_ms", "overhead_ms"}
+    for test in results["tests"]:
+        assert test.pop("duration_ms") >= 0 and test.pop("cpu_ms") >= 0, f"{test['name']} must be timed"
+    assert results == golden, "results apart from the timings must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_trace_memory_matches_golden_file(test_with_golden):
+    """
+    Test that --trace-memory only adds the memory fields to the results.
+    """
+    results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--trace-memory"])
+    exercise_dir = test_with_golden[0].parent
+    for test in results["tests"]:
+        if "variation" not in test["name"]:
+            assert test.pop("memory_peak_bytes") >= 0, f"{test['name']} must be traced"
+            for site in test.pop("memory_sites"):
+                filename = site["location"].split(":")[0]
+                assert exercise_dir.joinpath(filename).is_file() and not filename.endswith("_test.py")
+    assert results == golden, "results apart from the memory fields must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_read_only_writes_nothing_to_input(test_with_golden):
+    """
+    Test that a --read-only run matches the golden file and leaves its input directory as it was.
+    """
+    test_path, golden_path = test_with_golden
+    with tempfile.TemporaryDirectory(prefix="test-runner-read-only", dir=ROOT) as tmp_dir:
+        exercise_dir = Path(tmp_dir).joinpath(test_path.parent.name)
+        shutil.copytree(test_path.parent, exercise_dir, ignore=shutil.ignore_patterns("__pycache__", ".pytest_cache"))
+        before = sorted(exercise_dir.rglob("*"))
+        results, golden, rc = run_in_subprocess(
+            exercise_dir.joinpath(test_path.name), golden_path, runner_args=["--read-only"]
+        )
+        assert results == golden, "results with --read-only must match the golden file"
+        assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+        assert sorted(exercise_dir.rglob("*")) == before, "--read-only must not write to the input directory"
+
+
+def test_profile_and_trace_memory_are_exclusive():
+    """
+    Test that options profiling and tracing the memory of the solution at once are rejected.
+    """
+    with pytest.raises(ValueError):
+        data.Options(profile=True, trace_memory=True)
+
+
+def test_profile_lists_solution_functions():
+    """
+    Test that --profile writes a table of the solution's functions for every test.
+    """
+    exercise_dir = ROOT.joinpath("example-success")
+    with tempfile.TemporaryDirectory(prefix="test-runner-tests", dir=ROOT) as tmp_dir:
+        subprocess.run(
+            [RUNNER, "--profile", exercise_dir.name, exercise_dir, tmp_dir, "--color=no"], env={}, check=True
+        )
+        results = json.loads(Path(tmp_dir, "results.json").read_text())
+        profile = Path(tmp_dir, "profile.txt").read_text()
+
+    golden = json.loads(exercise_dir.joinpath("results.json").read_text())
+    assert results == golden, "results must match the golden file"
+    tables = [table.splitlines() for table in profile.strip().split("\n\n")]
+    assert len(tables) == len(golden["tests"]), "every test must have a profile"
+    for title, header, *rows in tables:
+        assert "Test::test_" in title
+        assert header.split() == ["ncalls", "tottime", "ms", "cumtime", "ms", "function"]
+        assert rows and all(row.endswith("example_success.py:4(hello)") for row in rows)
+
+
+@pytest.fixture(scope="module")
+def cache_dir():
+    """
+    Cache shared by every test in the module, pre-built for the test files here.
+    """
+    with tempfile.TemporaryDirectory(prefix="test-runner-cache") as tmp_dir:
+        subprocess.run(
+            [sys.executable, BUILD_CACHE, ROOT, "--cache-dir", tmp_dir],
+            env={key: value for key, value in os.environ.items() if key != "PYTHONPATH"},
+            cwd=tempfile.gettempdir(),
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        yield tmp_dir
+
+
+def test_cached_bytecode_matches_golden_file(test_with_golden, cache_dir):
+    """
+    Test that runs reading the shared cache match the golden file and leave it as it was.
+    """
+    before = {path: path.stat().st_mtime_ns for path in Path(cache_dir).rglob("*")}
+    results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--cache-dir", cache_dir])
+    assert results == golden, "results of a cached run must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+    after = {path: path.stat().st_mtime_ns for path in Path(cache_dir).rglob("*")}
+    assert after == before, "runs must not write to the shared cache"
+
+
+def test_stale_index_is_ignored():
+    """
+    Test that an index written by another version of the indexer isn't used.
+    """
+    test_path = ROOT.joinpath("example-partial-fail/example_partial_fail_test.py")
+    golden_path = test_path.parent.joinpath("results.json")
+    text = test_path.read_text()
+    stale = {
+        name: data.TestInfo(info.lineno, info.end_lineno, info.variants, "stale")
+        for name, info in sort.TestOrder.parse(text, test_path.name).items()
+    }
+    for magic in (testindex.MAGIC, b"PYTRIDX1"):
+        with tempfile.TemporaryDirectory(prefix="test-runner-cache") as cache_dir:
+            index = Path(cache_dir, testindex.INDEX_FILE)
+            testindex.write_index(index, {testindex.content_key(text): stale})
+            index.write_bytes(magic + index.read_bytes()[len(testindex.MAGIC) :])
+            results, golden, rc = run_in_subprocess(test_path, golden_path, runner_args=["--cache-dir", cache_dir])
+            assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+            if magic == testindex.MAGIC:
+                assert {test["test_code"] for test in results["tests"]} == {"stale"}, "the index must be used"
+            else:
+                assert results == golden, "results with a stale index must match the golden file"
+
+
+def test_uncached_bytecode_matches_golden_file(test_with_golden):
+    """
+    Test that runs with test files missing from the shared cache match the golden file.
+    """
+    with tempfile.TemporaryDirectory(prefix="test-runner-cache") as cache_dir:
+        results, golden, rc = run_in_subprocess(*test_with_golden, runner_args=["--cache-dir", cache_dir])
+        assert results == golden, "results of an uncached run must match the golden file"
+        assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+        assert not any(Path(cache_dir).iterdir()), "runs must not write to the shared cache"
+
+
+@pytest.mark.parametrize(
+    "runner_args, golden",
+    [
+        (["--timeout", "0.5"], "results-timeout.json"),
+        (["--run-timeout", "0.8"], "results-run-timeout.json"),
+    ],
+)
+def test_time_limits_match_golden_file(runner_args, golden):
+    """
+    Test that tests running out of time error while the others still report.
+    """
+    golden_path = LIMITS_TEST.parent.joinpath(golden)
+    results, golden, rc = run_in_subprocess(LIMITS_TEST, golden_path, runner_args=runner_args)
+    assert results == golden, f"results with {' '.join(runner_args)} must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_run_time_limit_covers_import():
+    """
+    Test that a solution looping forever on import errors the run once the run limit is used up.
+    """
+    golden_path = LIMITS_IMPORT_TEST.parent.joinpath("results.json")
+    results, golden, rc = run_in_subprocess(LIMITS_IMPORT_TEST, golden_path, runner_args=["--run-timeout", "0.8"])
+    assert results == golden, "results of a run out of time on import must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_run_time_limit_carries_into_workers():
+    """
+    Test that tests spread over several processes only get what is left of the run limit once collected.
+    """
+    golden_path = LIMITS_PARALLEL_TEST.parent.joinpath("results.json")
+    results, golden, rc = run_in_subprocess(
+        LIMITS_PARALLEL_TEST, golden_path, runner_args=["--run-timeout", "1.5", "--jobs", "2"]
+    )
+    assert results == golden, "results of parallel tests out of run time must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+@pytest.mark.parametrize("test_path", MEMORY_TESTS, ids=["test", "import"])
+def test_memory_limit_matches_golden_file(test_path):
+    """
+    Test that running out of memory errors the test, or the run when importing the solution.
+    """
+    results, golden, rc = run_in_subprocess(
+        test_path, test_path.parent.joinpath("results.json"), runner_args=["--memory-limit", "256"]
+    )
+    # the peak memory use in the messages depends on the machine
+    results = json.loads(re.sub(r"peak memory use \d+ MB", "peak memory use N MB", json.dumps(results)))
+    assert results == golden, "results of a run out of memory must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+@pytest.mark.parametrize("limit", [None, "4096"], ids=["default", "small"])
+def test_output_limit_matches_golden_file(limit):
+    """
+    Test that dropping the output past the limit doesn't change the results.
+    """
+    runner_args = ["--output-limit", limit] if limit else []
+    golden_path = OUTPUT_TEST.parent.joinpath("results.json")
+    results, golden, rc = run_in_subprocess(OUTPUT_TEST, golden_path, runner_args=runner_args)
+    assert results == golden, "results of a run with dropped output must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_output_limit_keeps_truncation_message():
+    """
+    Test that output limits too small to keep the truncation message of results.json are rejected.
+    """
+    with pytest.raises(ValueError):
+        data.Options(output_limit=data.MIN_OUTPUT_LIMIT - 1)
+    data.Options(output_limit=data.MIN_OUTPUT_LIMIT)
+
+
+def test_recursion_matches_golden_file():
+    """
+    Test that pruned tracebacks of runaway recursion and capped messages match the golden file.
+    """
+    golden_path = RECURSION_TEST.parent.joinpath("results.json")
+    results, golden, rc = run_in_subprocess(RECURSION_TEST, golden_path)
+    assert results == golden, "results of recursing tests must match the golden file"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+
+def test_failed_test_frames_are_released():
+    """
+    Test that the frames of a failed test are released once it has been reported, while the
+    exception of a test file that failed to load is still made into the message of the run.
+    """
+    golden_path = FRAMES_TEST.parent.joinpath("results.json")
+    results, golden, rc = run_in_subprocess(FRAMES_TEST, golden_path)
+    assert results == golden, "the locals of a failed test must be collectable by the next test"
+    assert rc == 0, f"return code must be 0 even when errors occur: got {rc}"
+
+    results, _, _ = run_in_subprocess(SYNTAX_ERROR_TEST, SYNTAX_ERROR_TEST.parent.joinpath("results.json"))
+    assert results["status"] == "error"
+    assert "SyntaxError: expected ':'" in results["message"], "the collection error must be kept for the message"
+
+
+def test_incremental_results_survive_crash():
+    """
+    Test that --incremental leaves the finished tests behind when the run is killed.
+    """
+    golden_path = CRASH_TEST.parent.joinpath("results.json")
+    results, golden, rc = run_in_subprocess(CRASH_TEST, golden_path, runner_args=["--incremental"])
+    assert results == golden, "results of a killed run must match the golden file"
+    assert rc != 0, "the run must have been killed"
+
+
+def test_staging_leaves_exercise_unchanged(monkeypatch):
+    """
+    Test that staging an exercise twice for bin/test_exercises.py strips the skips of its staged
+    tests and helpers, from a directory private to the run, and leaves the exercise's own files
+    as they were.
+    """
+    exercise = track_data.ExerciseInfo(
+        path=STAGING_EXERCISE, slug=STAGING_EXERCISE.name, name="Staging", uuid="", prerequisites=[]
+    )
+    sources = {path: path.read_bytes() for path in STAGING_EXERCISE.rglob("*") if path.is_file()}
+    with tempfile.TemporaryDirectory(prefix="test-runner-staging", dir=ROOT) as tmp_dir:
+        # next to the exercise, so that its files can be linked
+        monkeypatch.setattr(tempfile, "tempdir", tmp_dir)
+        for run in ("first", "second"):
+            workdir = Path(tmp_dir, run)
+            workdir.mkdir()
+            test_exercises.copy_exercise_files(exercise, workdir)
+            for name in ("staging_helpers_test.py", "staging_helpers_data.py"):
+                assert "@unittest.skip" not in workdir.joinpath(name).read_text(), f"{name} must be stripped"
+            assert workdir.joinpath("staging_helpers.py").read_bytes() == sources[
+                STAGING_EXERCISE.joinpath(".meta", "example.py")
+            ], "the exemplar must be staged as the solution"
+        assert not test_exercises.UNLINKABLE, "files on the same filesystem must be linked"
+        stripped_dir = test_exercises.stripped_dir()
+        assert stripped_dir.parent == Path(tmp_dir), "stripped files must be next to the workdirs"
+        assert stripped_dir.stat().st_mode & 0o077 == 0, "stripped files must be private to the run"
+
+    after = {path: path.read_bytes() for path in STAGING_EXERCISE.rglob("*") if path.is_file()}
+    assert after == sources, "staging must not change the exercise's files"
+
+
+def test_failed_runs_are_not_cached(monkeypatch, tmp_path):
+    """
+    Test that bin/test_exercises.py fails an exercise whose runner produced no outcome, and
+    caches the outcome only once a run produces one.
+    """
+    exercise = track_data.ExerciseInfo(
+        path=STAGING_EXERCISE, slug=STAGING_EXERCISE.name, name="Staging", uuid="", prerequisites=[]
+    )
+    outcomes = [None, 0]
+    monkeypatch.setitem(test_exercises.RUNNERS, "fake", lambda *args, **kwargs: outcomes.pop(0))
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    cache = test_exercises.ResultCache(tmp_path / "cache", "fake")
+
+    assert test_exercises.check_assignment(exercise, runner="fake", cache=cache) == 1
+    assert not tmp_path.joinpath("cache").is_dir(), "a run without an outcome must not be cached"
+    assert test_exercises.check_assignment(exercise, runner="fake", cache=cache) == 0
+    assert test_exercises.check_assignment(exercise, runner="fake", cache=cache) == 0, "must be cached"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.fixture
+def track(tmp_path, monkeypatch):
+    """
+    A track of a few of the example exercises, loaded by bin/test_exercises.py.
+    """
+    practice = []
+    for slug in TRACK_EXERCISES:
+        module = slug.replace("-", "_")
+        exercise_dir = tmp_path.joinpath("exercises", "practice", slug)
+        exercise_dir.joinpath(".meta").mkdir(parents=True)
+        shutil.copy(ROOT.joinpath(slug, f"{module}.py"), exercise_dir)
+        shutil.copy(ROOT.joinpath(slug, f"{module}.py"), exercise_dir.joinpath(".meta", "example.py"))
+        shutil.copy(ROOT.joinpath(slug, f"{module}_test.py"), exercise_dir)
+        files = {"solution": [f"{module}.py"], "test": [f"{module}_test.py"], "example": [".meta/example.py"]}
+        exercise_dir.joinpath(".meta", "config.json").write_text(json.dumps({"files": files}))
+        practice.append({"slug": slug, "name": slug, "uuid": slug, "prerequisites": [], "difficulty": 1})
+    config = {
+        "language": "Python",
+        "slug": "python",
+        "active": True,
+        "status": {"concept_exercises": True, "test_runner": True, "representer": False, "analyzer": False},
+        "blurb": "",
+        "version": 3,
+        "online_editor": {"indent_style": "space", "indent_size": 4},
+        "exercises": {"concept": [], "practice": practice},
+        "concepts": [],
+    }
+    config_file = tmp_path.joinpath("config.json")
+    config_file.write_text(json.dumps(config))
+
+    load = track_data.Config.load
+    monkeypatch.setattr(track_data.Config, "load", lambda: load(config_file))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def check_track(monkeypatch, capfd, *args):
+    """
+    Run bin/test_exercises.py with the given arguments and return what it printed.
+    """
+    monkeypatch.setattr(sys, "argv", ["test_exercises.py", *args])
+    with pytest.raises(SystemExit):
+        test_exercises.main()
+    return capfd.readouterr().out
+
+
+def test_exercises_checked_in_jobs_report_as_serial(track, monkeypatch, capfd):
+    """
+    Test that checking exercises at once with --jobs reports them as checking them one by one,
+    in slug order.
+    """
+    reports = {}
+    for jobs in ("1", "3"):
+        output = check_track(monkeypatch, capfd, "-q", "--no-cache", "--cache-dir", str(track / "cache"), "-j", jobs)
+        reports[jobs] = output[output.index("#") :]
+    assert reports["3"] == reports["1"], "the report of parallel checks must match that of serial ones"
+    headers = [line for line in reports["1"].splitlines() if line.startswith("#")]
+    assert headers == [f"#  {slug}" for slug in sorted(TRACK_EXERCISES)], "exercises must be checked in slug order"
+    assert TRACK_FAILURES in reports["1"]
+
+
+def test_exercises_checked_in_batch_report_each_exercise(track, monkeypatch, capfd):
+    """
+    Test that checking exercises with --batch reports every exercise with its own output.
+    """
+    # run bin/run.sh of this checkout, rather than in a container
+    monkeypatch.setattr(test_exercises, "TEST_RUNNER_DIR", BIN.parent)
+    output = check_track(
+        monkeypatch, capfd, "-r", "test-runner", "--batch", "--no-cache", "--cache-dir", str(track / "cache")
+    )
+    _, *sections = re.split(r"^#  (\S+)$", output, flags=re.M)
+    slugs, reports = sections[::2], sections[1::2]
+    assert slugs == sorted(TRACK_EXERCISES), "exercises must be checked in slug order"
+    for slug, report in zip(slugs, reports):
+        assert f"{slug.replace('-', '_')}_test.py" in report, f"{slug}: its output must be under its header"
+    assert TRACK_FAILURES in output
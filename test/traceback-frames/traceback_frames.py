@@ -0,0 +1,16 @@
+import weakref
+
+
+class Payload:
+    def __repr__(self):
+        return "Payload()"
+
+
+# weak references to the payloads of tests, which must not outlive them
+REFS = []
+
+
+def make_payload():
+    payload = Payload()
+    REFS.append(weakref.ref(payload))
+    return payload
@@ -0,0 +1,14 @@
+import gc
+import unittest
+
+from traceback_frames import REFS, make_payload
+
+
+class TracebackFramesTest(unittest.TestCase):
+    def test_fails_holding_payload(self):
+        payload = make_payload()
+        self.assertIsNone(payload)
+
+    def test_payload_is_released(self):
+        gc.collect()
+        self.assertEqual([ref() for ref in REFS], [None])
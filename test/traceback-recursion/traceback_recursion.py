@@ -0,0 +1,19 @@
+def factorial(number):
+    return number * factorial(number - 1)
+
+
+def countdown(number, seen=None):
+    seen = (seen or []) + [number]
+    return countdown(number - 1, seen)
+
+
+def forever():
+    return forever()
+
+
+def ping(number):
+    return pong(number + 1)
+
+
+def pong(number):
+    return ping(number + 1)
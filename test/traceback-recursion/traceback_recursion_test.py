@@ -0,0 +1,29 @@
+import unittest
+
+from traceback_recursion import factorial, countdown, forever, ping
+
+
+class TracebackRecursionTest(unittest.TestCase):
+    def test_factorial(self):
+        self.assertEqual(factorial(5), 120)
+
+    def test_countdown(self):
+        self.assertEqual(countdown(5), 0)
+
+    def test_plain(self):
+        self.assertEqual(factorial.__name__, "fact")
+
+    def test_forever(self):
+        self.assertEqual(forever(), 1)
+
+    def test_mutual(self):
+        self.assertEqual(ping(1), 1)
+
+    def test_variations(self):
+        for variant in range(1, 4):
+            with self.subTest(f"variation #{variant}"):
+                self.assertEqual(factorial(variant), 1)
+
+    def test_long_message(self):
+        self.maxDiff = None
+        self.assertEqual(list(range(2000)), list(range(1, 2001)))